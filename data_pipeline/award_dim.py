@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# Award dimension for the feature build.
+#
+# The award CSVs (all-star, MVP, All-NBA 1st-3rd team) are a few thousand rows in total, so they are read once
+# into one row per (player_id, season) holding every award of that season as an int8 bitmask (AWARD_BITS).
+# The box scores join that table once instead of once per award, and the bitmask is only decoded into the
+# {award}_this_season flags where they are needed (award_flags_sql() in a query, decode_awards() in pandas).
+# Seasons are start years, the same as the box-score season column.
+# lagged_awards() gives every player-season the previous season's flags, indexed by player_season_key() so the
+# feature tables pick them up with a single integer lookup.
+
+AWARDS = ['all_star', 'mvp', 'all_nba_first_team', 'all_nba_second_team', 'all_nba_third_team']
+
+AWARD_FILES = {
+    'all_star': 'nba-all-stars.csv',
+    'mvp': 'nba-mvp.csv',
+    'all_nba_first_team': 'all-nba-first-team.csv',
+    'all_nba_second_team': 'all-nba-second-team.csv',
+    'all_nba_third_team': 'all-nba-third-team.csv',
+}
+
+AWARD_BITS = {award: 1 << i for i, award in enumerate(AWARDS)}
+
+
+def read_award_tables():
+    '''
+    The award CSVs as {award: dataframe with player_id and Season}.
+    The all-star file has the year of the game (e.g. 2024 for the 2023-24 season), the others "2023-24" strings.
+    '''
+    tables = {}
+    for award, filename in AWARD_FILES.items():
+        df = pd.read_csv(filename)
+        if award == 'all_star':
+            df["Season"] = df["Selection Year"] - 1
+        else:
+            df["Season"] = df["Season"].str[:4].astype(int)
+        # attach_player_ids.py leaves player_id empty for names it could not match; those rows never joined
+        df = df.dropna(subset=["player_id"])
+        df["player_id"] = df["player_id"].astype(int)
+        tables[award] = df
+    return tables
+
+
+def player_season_key(player_id, season):
+    '''Single integer key for a (player_id, season) pair, e.g. 2544 in 2023 -> 25442023'''
+    return np.asarray(player_id, dtype='int64') * 10000 + np.asarray(season, dtype='int64')
+
+
+def award_bits(tables=None):
+    '''
+    One row per (player_id, season) with an award, with the int8 bitmask of its awards in an awards column.
+    tables = output of read_award_tables(), read from the CSVs when None
+    '''
+    tables = tables if tables is not None else read_award_tables()
+    flags = pd.concat([
+        tables[award][['player_id', 'Season']].rename(columns={'Season': 'season'}).assign(awards=AWARD_BITS[award])
+        for award in AWARDS
+    ], ignore_index=True)
+    # A player listed twice for the same award still only sets its bit once
+    flags = flags.drop_duplicates()
+    out = flags.groupby(['player_id', 'season'], sort=True)['awards'].sum().astype('int8')
+    return out.reset_index()
+
+
+def decode_awards(bits, suffix='_this_season'):
+    '''
+    Split award bitmasks into int8 flags.
+    bits = a series of bitmasks from award_bits(); missing values count as no awards
+    Returns a dataframe with an {award}{suffix} column per award, on the index of bits.
+    '''
+    values = bits.fillna(0).to_numpy(dtype='int64')
+    return pd.DataFrame({f'{award}{suffix}': ((values & bit) != 0).astype('int8') for award, bit in AWARD_BITS.items()},
+                        index=bits.index)
+
+
+def award_flags_sql(column='awards', suffix='_this_season'):
+    '''SELECT list that decodes a bitmask column in a DuckDB query, e.g. ",CAST((awards & 2) <> 0 AS TINYINT) AS mvp_this_season"'''
+    return '\n'.join(f'    ,CAST(({column} & {bit}) <> 0 AS TINYINT) AS {award}{suffix}' for award, bit in AWARD_BITS.items())
+
+
+def lagged_awards(bits, lag=1):
+    '''
+    The award flags of `lag` seasons earlier, for every player-season that has them.
+    bits = output of award_bits()
+    Returns a dataframe indexed by player_season_key() with {award}_last_season columns. The season key is shifted
+    by lag in one vectorized step, so a player-season without a row has no awards in the previous season.
+    '''
+    key = player_season_key(bits['player_id'], bits['season'] + lag)
+    out = decode_awards(bits['awards'], suffix='_last_season').set_axis(key)
+    out.index.name = 'player_season_key'
+    return out
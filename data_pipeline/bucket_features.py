@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+# Threshold buckets for the weekly "games_w_*" features, added 12/8/2025.
+# Each entry is (stat, lower edges). Bucket i covers edges[i] .. edges[i+1] - 1 and the last one
+# is open ended, so [0, 10, 20] gives games_w_{stat}_between_0_9, _between_10_19 and _20_plus.
+# New threshold sets only need a new entry here.
+GAME_STAT_BUCKETS = [
+    ('points', [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]),
+    ('assists', [0, 10, 20, 30, 40]),
+    ('reboundsTotal', [0, 10, 20, 30, 40]),
+    ('reboundsOffensive', [0, 10, 20, 30, 40]),
+    ('reboundsDefensive', [0, 10, 20, 30, 40]),
+    ('steals', [0, 3, 6, 10]),
+    ('blocks', [0, 3, 6, 10, 13, 15]),
+]
+
+
+def bucket_column_names(stat, edges):
+    names = [f"games_w_{stat}_between_{lo}_{hi - 1}" for lo, hi in zip(edges[:-1], edges[1:])]
+    names.append(f"games_w_{stat}_{edges[-1]}_plus")
+    return names
+
+
+def bucket_counts(df, group_cols, buckets=GAME_STAT_BUCKETS):
+    '''
+    Count rows per group falling into each threshold bucket, for every stat in buckets.
+
+    Replaces one SUM(CASE WHEN stat BETWEEN lo AND hi THEN 1 ELSE 0 END) per bucket with a single
+    pass per stat: each row gets a bucket index from np.searchsorted, and np.bincount over
+    (group index, bucket index) counts every bucket at once.
+
+    df = A pandas dataframe with one row per game
+    group_cols = list of columns to count by, e.g. the weekly aggregation keys
+    buckets = list of (stat, lower edges) pairs, see GAME_STAT_BUCKETS
+    Returns one row per group with the group columns followed by the bucket count columns.
+    Rows with a missing or below-range stat are not counted, like the SQL they replace.
+    '''
+    # dropna=False keeps groups with null keys, as SQL GROUP BY does; observed=True keeps categorical keys
+    # (team names) to the combinations that occur
+    grouped = df.groupby(group_cols, sort=False, dropna=False, observed=True)
+    group_idx = grouped.ngroup().to_numpy()
+    n_groups = grouped.ngroups
+
+    out = grouped.size().reset_index()[group_cols]
+    counts = {}
+    for stat, edges in buckets:
+        values = df[stat].to_numpy(dtype=float)
+        n_buckets = len(edges)
+        bucket_idx = np.searchsorted(np.asarray(edges, dtype=float), values, side='right') - 1
+        counted = (bucket_idx >= 0) & ~np.isnan(values)
+        flat = group_idx[counted] * n_buckets + bucket_idx[counted]
+        stat_counts = np.bincount(flat, minlength=n_groups * n_buckets).reshape(n_groups, n_buckets)
+        # float, like the SQL SUMs these columns used to come from
+        for j, name in enumerate(bucket_column_names(stat, edges)):
+            counts[name] = stat_counts[:, j].astype(float)
+
+    return pd.concat([out, pd.DataFrame(counts, index=out.index)], axis=1)
+
+
+def add_bucket_counts(agg_df, df, group_cols, after, buckets=GAME_STAT_BUCKETS):
+    '''
+    Join bucket_counts(df, group_cols) onto an aggregate already grouped by group_cols and place
+    the bucket columns right after the column named `after`.
+    '''
+    counts = bucket_counts(df, group_cols, buckets)
+    bucket_cols = [c for c in counts.columns if c not in group_cols]
+    merged = agg_df.merge(counts, on=group_cols, how='left')
+
+    cols = list(agg_df.columns)
+    pos = cols.index(after) + 1
+    return merged[cols[:pos] + bucket_cols + cols[pos:]]
@@ -0,0 +1,184 @@
+import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from team_dim import CONFERENCE_CODES
+
+# Calendar dimension shared by every weekly join in the feature build.
+#
+# One row per day, keyed by an integer date key (yyyymmdd). Every date attribute the features use is computed
+# here once instead of per row in each query:
+#   day, month, year        calendar parts of the date
+#   iso_year, iso_week      ISO 8601 week (Mon-Sun); week_key = iso_year * 100 + iso_week
+#   week_start              Monday of the ISO week
+#   season                  NBA season from SEASON_RANGES (box scores, award flags); NULL outside every range
+#   team_season             season starting in July (team records in build_team_games)
+#   pow_week_key            week_key of the week a Player of the Week announced on this date covers. The award is
+#                           announced on the Monday after the week, so this is the week_key of the day before.
+# The POW join used to match DuckDB WEEK() (ISO week) with YEAR() (calendar year). Around New Year the two disagree,
+# e.g. 2024-12-30 is ISO week 1 of 2025 but calendar year 2024, so late-December games were joined to the POW of the
+# first week of the previous January. week_key keeps week and year on the same ISO basis.
+
+START_DATE = '1946-01-01'
+
+# (first day, last day, season). Checked in order and the first range containing the date wins, like the
+# CASE WHEN it replaces, so where two ranges overlap (1975/1976, 1997/1998) the earlier entry takes the date.
+SEASON_RANGES = [
+    ('2025-10-02', '2026-08-01', 2025),
+    ('2024-10-04', '2025-06-22', 2024),
+    ('2023-10-05', '2024-06-17', 2023),
+    ('2022-09-30', '2023-06-12', 2022),
+    ('2021-10-03', '2022-06-16', 2021),
+    ('2020-12-11', '2021-07-20', 2020),
+    ('2019-10-22', '2020-10-11', 2019),
+    ('2018-10-16', '2019-06-10', 2018),
+    ('2017-09-30', '2018-06-08', 2017),
+    ('2016-10-01', '2017-06-12', 2016),
+    ('2015-10-02', '2016-06-19', 2015),
+    ('2014-10-04', '2015-06-16', 2014),
+    ('2013-10-05', '2014-06-15', 2013),
+    ('2012-10-05', '2013-06-20', 2012),
+    ('2011-12-16', '2012-06-21', 2011),
+    ('2010-10-03', '2011-06-12', 2010),
+    ('2009-10-01', '2010-06-17', 2009),
+    ('2008-10-05', '2009-06-11', 2008),
+    ('2007-10-06', '2008-06-17', 2007),
+    ('2006-10-05', '2007-06-14', 2006),
+    ('2005-10-10', '2006-04-19', 2005),
+    ('2004-11-02', '2005-06-21', 2004),
+    ('2003-10-28', '2004-06-15', 2003),
+    ('2002-10-29', '2003-06-15', 2002),
+    ('2001-10-30', '2002-04-17', 2001),
+    ('2000-10-31', '2001-06-15', 2000),
+    ('1999-11-02', '2000-04-19', 1999),
+    ('1998-02-05', '1999-06-25', 1998),
+    ('1997-10-31', '1998-06-14', 1997),
+    ('1996-11-01', '1997-06-13', 1996),
+    ('1995-11-03', '1996-04-21', 1995),
+    ('1994-11-04', '1995-06-14', 1994),
+    ('1993-11-05', '1994-04-24', 1993),
+    ('1992-11-06', '1993-06-20', 1992),
+    ('1991-11-01', '1992-06-12', 1991),
+    ('1990-11-02', '1991-06-12', 1990),
+    ('1989-11-03', '1990-06-14', 1989),
+    ('1988-11-04', '1989-06-13', 1988),
+    ('1987-11-06', '1988-06-19', 1987),
+    ('1986-10-31', '1987-06-14', 1986),
+    ('1985-10-25', '1986-06-05', 1985),
+    ('1984-10-26', '1985-06-09', 1984),
+    ('1983-10-28', '1984-06-12', 1983),
+    ('1982-10-29', '1983-05-31', 1982),
+    ('1981-10-30', '1982-06-06', 1981),
+    ('1980-10-10', '1981-05-14', 1980),
+    ('1979-10-12', '1980-05-16', 1979),
+    ('1978-10-13', '1979-06-01', 1978),
+    ('1977-10-18', '1978-06-07', 1977),
+    ('1976-02-13', '1977-06-05', 1976),
+    ('1976-02-03', '1976-06-06', 1975),
+    ('1974-10-17', '1975-05-25', 1974),
+    ('1973-10-09', '1974-05-12', 1973),
+    ('1972-10-10', '1973-05-10', 1972),
+    ('1971-10-12', '1972-05-07', 1971),
+    ('1971-01-12', '1971-04-30', 1970),
+    ('1969-10-14', '1970-05-08', 1969),
+    ('1968-10-15', '1969-03-24', 1968),
+    ('1967-10-13', '1968-05-02', 1967),
+    ('1967-01-10', '1967-04-24', 1966),
+    ('1965-10-15', '1966-04-28', 1965),
+    ('1964-10-16', '1965-03-21', 1964),
+    ('1963-10-16', '1964-04-26', 1963),
+    ('1962-10-19', '1963-04-24', 1962),
+    ('1961-02-16', '1962-04-18', 1961),
+    ('1961-01-17', '1961-01-17', 1960),
+    ('1959-10-18', '1960-04-09', 1959),
+    ('1958-10-19', '1959-03-11', 1958),
+    ('1957-10-22', '1958-03-12', 1957),
+    ('1956-10-27', '1957-04-13', 1956),
+    ('1955-11-05', '1956-04-05', 1955),
+    ('1954-10-30', '1955-04-10', 1954),
+    ('1953-10-30', '1954-04-11', 1953),
+    ('1952-10-31', '1953-04-10', 1952),
+    ('1951-11-01', '1952-04-23', 1951),
+    ('1950-10-31', '1951-04-21', 1950),
+    ('1949-10-29', '1950-04-23', 1949),
+    ('1948-11-01', '1949-04-13', 1948),
+    ('1947-11-12', '1948-04-21', 1947),
+    ('1946-11-01', '1947-04-22', 1946),
+]
+
+def date_key(dates):
+    '''
+    Integer yyyymmdd key for a series of dates (strings, dates or timestamps; tz-aware timestamps use their own
+    time zone). Missing dates give NaN.
+    '''
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    return dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day
+
+
+def build_calendar(start=START_DATE, end=None):
+    '''
+    start, end = first and last day of the dimension. end defaults to the end of next year, which covers the
+    filler POW weeks built ahead of the announcements.
+    Returns one row per day, see the columns above.
+    '''
+    if end is None:
+        end = f'{datetime.date.today().year + 1}-12-31'
+    dates = pd.Series(pd.date_range(start, end, freq='D'))
+    iso = dates.dt.isocalendar()
+    week_key = (iso['year'] * 100 + iso['week']).astype(int)
+    # Day before, i.e. the last day of the week an award announced on this date covers
+    pow_iso = (dates - pd.Timedelta(days=1)).dt.isocalendar()
+
+    season = pd.Series(pd.NA, index=dates.index, dtype='Int64')
+    # Assign the ranges last to first so the first matching range is the one that sticks
+    for first, last, s in reversed(SEASON_RANGES):
+        season[(dates >= first) & (dates <= last)] = s
+
+    calendar = pd.DataFrame({
+        'date_key': date_key(dates).astype(int),
+        'date': dates,
+        'day': dates.dt.day,
+        'month': dates.dt.month,
+        'year': dates.dt.year,
+        'iso_year': iso['year'].astype(int),
+        'iso_week': iso['week'].astype(int),
+        'week_key': week_key,
+        'week_start': dates - pd.to_timedelta(dates.dt.weekday, unit='D'),
+        'season': season,
+        'team_season': np.where(dates.dt.month >= 7, dates.dt.year, dates.dt.year - 1),
+        'pow_week_key': (pow_iso['year'] * 100 + pow_iso['week']).astype(int),
+    })
+    return calendar
+
+
+@lru_cache(maxsize=None)
+def get_calendar():
+    '''The calendar dimension indexed by date_key, built once per process.'''
+    return build_calendar().set_index('date_key')
+
+
+def calendar_lookup(dates, columns):
+    '''
+    Calendar attributes for a series of dates, aligned with its index.
+    dates = series of dates (anything date_key() accepts)
+    columns = list of calendar columns to return
+    Raises ValueError for dates outside the dimension; missing dates get missing attributes.
+    '''
+    keys = date_key(dates)
+    out = get_calendar()[columns].reindex(keys.to_numpy())
+    missing = out.index.notna() & ~out.index.isin(get_calendar().index)
+    if missing.any():
+        raise ValueError(f"Dates outside the calendar dimension ({START_DATE} onwards): {sorted(set(keys[missing]))[:5]}")
+    out.index = dates.index
+    return out
+
+
+def conference_week_key(week_key, conference):
+    '''
+    Key for one conference's week, week_key * 10 + CONFERENCE_CODES[conference]. Games are matched to their
+    conference's Player of the Week with it rather than joining both conferences and filtering afterwards.
+    '''
+    return week_key * 10 + conference.map(CONFERENCE_CODES)
@@ -0,0 +1,1245 @@
+import argparse
+import pandas as pd
+import numpy as np
+import duckdb
+import wget
+import os
+from google.cloud import storage
+import gc
+from grouped_moments import shifted_expanding_moments, group_moments, combine_moments, normalize_by_lagged_group
+from bucket_features import add_bucket_counts, GAME_STAT_BUCKETS, bucket_column_names
+from for_inference import create_data_for_realtime_inference
+import feature_state
+import feature_store
+from memory_budget import MemoryBudget, NoBudget, parse_size
+from calendar_dim import get_calendar, calendar_lookup, date_key, conference_week_key
+from team_standings import running_standings, update_standings
+from team_dim import team_conference_df, team_conference, team_dictionary, team_key, team_dtype, conference_key, CONFERENCE_DTYPE
+from award_dim import read_award_tables, award_bits, award_flags_sql, lagged_awards, player_season_key
+
+# One engine for all four feature tables. They share every join up to the per-game player rows and only differ in
+#   mode:        training uses the announced Player of the Week rows; inference adds filler rows for the weeks
+#                that have not been announced yet (for_inference.create_data_for_realtime_inference)
+#   feature set: overall is the base table; deji adds the threshold buckets, intra-week win pct and
+#                prior-season awards (added 12/8/2025 and 12/22/2025)
+# The shared base is built once with the inference POW rows, each row tagged with whether its POW is a filler.
+MODES = ['training', 'inference']
+FEATURE_SETS = ['overall', 'deji']
+OUTPUT_SUFFIXES = {
+    ('training', 'overall'): '',
+    ('training', 'deji'): '_deji',
+    ('inference', 'overall'): '_for_inference',
+    ('inference', 'deji'): '_for_inference_deji',
+}
+
+def download_inputs():
+    # Download CSV files
+    wget.download('https://storage.googleapis.com/nba_award_predictor/nba_data/nba-all-stars.csv')
+    wget.download('https://storage.googleapis.com/nba_award_predictor/nba_data/nba-mvp.csv')
+    wget.download('https://storage.googleapis.com/nba_award_predictor/nba_data/all-nba-first-team.csv')
+    wget.download('https://storage.googleapis.com/nba_award_predictor/nba_data/all-nba-second-team.csv')
+    wget.download('https://storage.googleapis.com/nba_award_predictor/nba_data/all-nba-third-team.csv')
+    wget.download('https://storage.googleapis.com/nba_award_predictor/nba_data/player-of-the-week.csv')
+    wget.download('https://storage.googleapis.com/nba_award_predictor/nba_data/player-statistics.csv')
+    wget.download('https://storage.googleapis.com/nba_award_predictor/nba_data/games.csv')
+
+    # Kaggle source data changed the gameDate column name to gameDateTimeEst on 11/24/25. This code reverts the column back to gameDate.
+    games_df = pd.read_csv('games.csv')
+    query = """
+    SELECT
+    gameId
+    ,CAST(gameDateTimeEst AS DATE) AS gameDate
+    ,hometeamCity
+    ,hometeamName
+    ,hometeamId
+    ,awayteamCity
+    ,awayteamName
+    ,awayteamId
+    ,homeScore
+    ,awayScore
+    ,winner
+    ,gameType
+    ,attendance
+    ,arenaId
+    ,gameLabel
+    ,gameSubLabel
+    ,seriesGameNumber
+    FROM games_df
+
+    """
+    games_df = duckdb.query(query).df()
+    games_df.to_csv('games.csv')
+
+
+def team_records(events):
+    '''Team records before each game: per season with home/away splits and streaks, and within the week.'''
+    records = running_standings(events, ['teamid', 'season'], ['gamedate', 'gameid'])
+    return running_standings(records, ['teamid', 'season', 'week_key'], ['gamedate', 'gameid'],
+                             prefix='week_', home=False, streaks=False)
+
+
+def history_start(state, standings):
+    '''
+    First game date an incremental build reads for one of the standings tables in the state, e.g. "team_standings".
+    Earlier games are in the persisted standings. The window starts at the beginning (July 1) of the team season
+    before the cutoff's: game dates parsed with day and month swapped stay in their year, so a game of the open
+    season can land in the previous team season, and the season-long counts built on the standings need all of it.
+    Returns None (read everything) for a full build, or when the state has no such standings.
+    '''
+    if state is None or state.get(standings) is None:
+        return None
+    team_season = calendar_lookup(pd.Series([state['cutoff']]), ['team_season'])['team_season'].iloc[0]
+    return pd.Timestamp(year=int(team_season) - 1, month=7, day=1)
+
+
+def build_team_games(df, filter=None, standings=None, since=None, until=None):
+    '''
+    One row per team per game with the team's record before the game.
+    standings = team standings returned by an earlier call, or None to compute every team-season
+    since = history_start() of an incremental build: only games from that date on are read, and only their
+            team-seasons are returned. Earlier games must be in standings.
+    until = games on or after this date (as the box scores date them) are not read, e.g. the weeks after the
+            week an inference run builds
+    Returns (team games, updated standings to persist)
+    '''
+    df = df.copy()
+    if until is not None:
+        # On the box-score dates that key the weeks, before the day-first parse below
+        df = df[pd.to_datetime(df['gamedate'], utc=True, errors='coerce', format='mixed').dt.tz_localize(None) < until]
+
+    # Parse datetime with mixed formats
+    df['gamedate'] = pd.to_datetime(
+        df['gamedate'],
+        utc=True,
+        errors='coerce',
+        format='mixed',
+        dayfirst=True,
+    )
+
+    if filter:
+        df = df.query(filter)
+    if since is not None:
+        df = df[df['gamedate'].dt.tz_localize(None) >= since]
+        print(f"Team games: {len(df)} games read since {since.date()}")
+
+    # Normalize: make two rows per game (home + away)
+    home = df.rename(columns={
+        'hometeamname': 'team',
+        'hometeamid':   'teamid',
+        'homescore':    'team_score',
+        'awayscore':    'opp_score'
+    })[['gameid','gamedate','team','teamid','team_score','opp_score','winner',
+        'awayteamname','awayteamid']].assign(
+            home = 1,
+            opponent  = lambda x: x['awayteamname'],
+            opponentid= lambda x: x['awayteamid'],
+        ).drop(columns=['awayteamname','awayteamid'])
+
+    away = df.rename(columns={
+        'awayteamname': 'team',
+        'awayteamid':   'teamid',
+        'awayscore':    'team_score',
+        'homescore':    'opp_score'
+    })[['gameid','gamedate','team','teamid','team_score','opp_score','winner',
+        'hometeamname','hometeamid']].assign(
+            home = 0,
+            opponent  = lambda x: x['hometeamname'],
+            opponentid= lambda x: x['hometeamid'],
+        ).drop(columns=['hometeamname','hometeamid'])
+
+    long = pd.concat([home, away], ignore_index=True)
+
+    # Outcome flags
+    long['is_win']  = (long['teamid'] == long['winner']).astype(int)
+    long['outcome'] = long['is_win'].map({1: 'win', 0: 'loss'})
+
+    # Season (season starts in July) and ISO week from the calendar dimension
+    days = calendar_lookup(long['gamedate'], ['team_season', 'week_key'])
+    long['season'] = days['team_season']
+    long['week_key'] = days['week_key']
+
+    # Records before each game, per team-season and per team-season-week (Mon–Sun), from the standings engine.
+    # With the standings of an earlier run only the team-seasons that got a new game are recomputed.
+    standings = update_standings(standings, long, ['gameid', 'teamid'], ['teamid', 'season'], team_records)
+    long = standings
+    if since is not None:
+        long = long[long['gamedate'].dt.tz_localize(None) >= since]
+    long = long.sort_values(['teamid', 'season', 'gamedate', 'gameid'], kind='mergesort')
+
+    # Record strings ("W-L") are only built for the output files, see add_record_strings()
+
+    # Opponent's prior record for same game (still season-based because wins_prior/losses_prior are)
+    opp_prior = long[['gameid','teamid','wins_prior','losses_prior']].rename(
+        columns={
+            'teamid': 'opponentid',
+            'wins_prior': 'opp_wins_prior',
+            'losses_prior': 'opp_losses_prior'
+        }
+    )
+
+    long = long.merge(opp_prior, on=['gameid','opponentid'], how='left')
+
+    # Opponent winrate prior to the game
+    opp_games_prior = long['opp_wins_prior'] + long['opp_losses_prior']
+    long['opp_winrate_prior'] = long['opp_wins_prior'] / opp_games_prior.where(opp_games_prior > 0)
+
+    # Flag for wins vs > .500 opponent (per game)
+    long['is_win_vs_over_500'] = (
+        (long['is_win'] == 1) &
+        (long['opp_winrate_prior'] > 0.5)
+    ).astype(int)
+
+    # Per-team, per-season cumulative PRIOR wins vs > .500
+    long['wins_vs_over_500_prior'] = (
+        long.groupby(['teamid', 'season'], sort=False)['is_win_vs_over_500'].cumsum() - long['is_win_vs_over_500']
+    )
+
+    # Final output
+    out = long[['gameid','gamedate',
+                'team','teamid',
+                'opponent','opponentid',
+                'outcome','home',
+                'team_score','opp_score',
+                'games_prior','wins_prior','losses_prior',
+                'home_games_prior','home_wins_prior','home_losses_prior',
+                'away_games_prior','away_wins_prior','away_losses_prior',
+                'win_streak_prior','home_win_streak_prior','away_win_streak_prior',
+                'opp_wins_prior','opp_losses_prior','opp_winrate_prior',
+                'is_win_vs_over_500','wins_vs_over_500_prior',
+                'week_games_prior','week_wins_prior','week_losses_prior',
+                'season'
+            ]]
+    out.loc[:, 'gameid'] = out['gameid'].astype(int)
+    out = out.rename(columns={'gameid': 'gameId'})
+
+    return out.sort_values(['gamedate','gameId','home']).reset_index(drop=True), standings
+
+def wins_vs_all_nba(first,second,third,stats):
+    stats = stats.rename(columns={"gameId": "game_id"})
+    all_nba = pd.concat([first, second, third], ignore_index=True)
+    all_nba_player_ids = all_nba["player_id"].dropna().unique()
+
+    df = stats[["player_id", "full_name", "game_id", "team_key", "opponent_team_key", "win"]].copy()
+
+    # Flag each box-score row whose player appears on an All-NBA team
+    df["is_all_nba"] = df["player_id"].isin(all_nba_player_ids).astype("int8")
+
+    # Semi-join: a (game, team) roster has an All-NBA player if any of its rows is flagged.
+    # Keyed by team so it can be joined back onto the opponent side of each row.
+    team_has_all_nba = (
+        df.groupby(["game_id", "team_key"], as_index=False)["is_all_nba"]
+        .max()
+        .rename(columns={"team_key": "opponent_team_key", "is_all_nba": "opponent_has_all_nba"})
+    )
+
+    df = df.merge(
+        team_has_all_nba,
+        on=["game_id", "opponent_team_key"],
+        how="left"
+    )
+
+    # Opponents with no box-score rows for this game have no All-NBA player
+    df["opponent_has_all_nba"] = df["opponent_has_all_nba"].fillna(0).astype(int)
+
+    df["wins_vs_team_with_all_nba_player"] = (
+        (df["win"] == 1) & (df["opponent_has_all_nba"] == 1)
+    ).astype(int)
+
+    df["player_name"] = df["full_name"]
+
+    output = df[[
+        "player_id",
+        "player_name",
+        "game_id",
+        "team_key",
+        "opponent_team_key",
+        "win",
+        "opponent_has_all_nba",
+        "wins_vs_team_with_all_nba_player"
+    ]].sort_values("game_id").reset_index(drop=True)
+
+    return output
+
+def zscore(x, mu, sd):
+    x = x.astype(float); mu = mu.astype(float); sd = sd.astype(float)
+    return np.where(sd > 0, (x - mu) / sd, 0.0)
+
+
+def build_base(state=None, include_filler_weeks=False, budget=None, until=None):
+    '''
+    Builds the per-game player rows shared by every mode and feature set: team records, Player of the Week,
+    box scores, award flags and wins vs All-NBA opponents, keyed by week_start.
+
+    state = None for a full rebuild since 1979. Otherwise the running state from feature_state.load_state():
+            only games on or after state['cutoff'] are kept, and games and box scores from before
+            history_start() are not read past the CSV.
+    include_filler_weeks = also join the filler POW rows from player-of-the-week-for-inference.csv. Rows that
+            came from a filler week have pow_filler = True.
+    until = games and box scores on or after this date are not read, e.g. the Monday after the week
+            build_inference_week() builds
+    budget = MemoryBudget that records each step; intermediates are deleted as soon as their last consumer is done
+    Returns (base_df, player_statistics_test_df, team_standings). player_statistics_test_df holds the season-tagged
+    box scores the deji win pct standings need (every season without a state); team_standings is the updated
+    standings state from build_team_games().
+    '''
+    cutoff = state['cutoff'] if state is not None else None
+    budget = budget or NoBudget()
+
+    budget.start('base: team records')
+    games_df = pd.read_csv('games.csv')
+    games_df.columns = games_df.columns.str.lower()
+    # Every join below compares teams by integer key instead of by name. The dictionary covers every game, so
+    # keys stay the same whatever part of the history a run reads.
+    teams = team_dictionary(games_df['hometeamname'], games_df['awayteamname'])
+    game, team_standings = build_team_games(games_df, "gamedate.dt.year >= 1979",
+                                            state['team_standings'] if state is not None else None,
+                                            since=history_start(state, 'team_standings'), until=until)
+    game['team_key'] = team_key(game['team'], teams)
+
+    # The null values in game["opp_winrate_prior"] represent games where the opponent had played zero regular season
+    # games at that point (e.g. first game of the season). Set game["opp_winrate_prior"] to 0.500 for these rows.
+    game["opp_winrate_prior"] = game["opp_winrate_prior"].fillna(0.500)
+    del games_df
+
+    budget.start('base: player of the week')
+    pow_df = pd.read_csv('player-of-the-week.csv')
+    last_announced_date = pd.to_datetime(pow_df['date']).max()
+    if include_filler_weeks:
+        pow_df = pd.read_csv('player-of-the-week-for-inference.csv')
+    # Filler rows are dated after the last announced Player of the Week
+    pow_df['pow_filler'] = pd.to_datetime(pow_df['date']) > last_announced_date
+    pow_df['date_key'] = date_key(pow_df['date'])
+    calendar = get_calendar().reset_index()
+
+    query = """
+    WITH CTE AS (
+    SELECT
+    player_id
+    ,pow_df.season
+    ,player
+    ,team_conference_df.conference
+    ,(CAST(pow_df.date AS DATE) - 1) AS date
+    ,calendar.pow_week_key AS week_key
+    ,pow_df.team
+    ,pos
+    ,height
+    ,weight
+    ,age
+    ,"Pre-Draft Team"
+    ,"Draft Yr"
+    ,yos
+    ,pow_filler
+
+    FROM pow_df
+    JOIN team_conference_df
+    ON pow_df.team = team_conference_df.team
+    JOIN calendar
+    ON pow_df.date_key = calendar.date_key
+    )
+
+    SELECT * FROM CTE
+
+    """
+
+    pow_df = duckdb.query(query).df()
+    pow_df = pow_df[['player_id','player','conference','date','week_key','pow_filler']]
+    pow_df['conference_key'] = conference_key(pow_df['conference'])
+    pow_df['conference_week_key'] = conference_week_key(pow_df['week_key'], pow_df['conference'])
+
+    # Each game is matched to the POW of its own conference's week. Nicknames shared across conferences (Hornets)
+    # get a row for each conference, as the conference join further down used to produce.
+    game['date_key'] = date_key(game['gamedate'])
+    team_conferences = team_conference_df[['team_nickname', 'conference']].drop_duplicates()
+    team_conferences['team_key'] = team_key(team_conferences['team_nickname'], teams)
+    query = """
+    SELECT
+    gameId
+    ,calendar.date AS gamedate
+    ,calendar.day
+    ,calendar.iso_week AS week
+    ,calendar.month
+    ,calendar.year
+    ,team_conferences.conference
+    ,calendar.week_key
+    ,team
+    ,game.team_key
+    ,teamid
+    ,opponent
+    ,opponentid
+    ,outcome
+    ,home
+    ,team_score
+    ,opp_score
+    ,games_prior
+    ,wins_prior
+    ,losses_prior
+    ,home_games_prior
+    ,home_wins_prior
+    ,home_losses_prior
+    ,away_games_prior
+    ,away_wins_prior
+    ,away_losses_prior
+    ,win_streak_prior
+    ,home_win_streak_prior
+    ,away_win_streak_prior
+    ,opp_wins_prior
+    ,opp_losses_prior
+    ,opp_winrate_prior
+    ,is_win_vs_over_500
+    ,wins_vs_over_500_prior
+    ,week_games_prior
+    ,week_wins_prior
+    ,week_losses_prior
+    ,game.season
+    FROM game
+    JOIN calendar
+    ON game.date_key = calendar.date_key
+    JOIN team_conferences
+    ON game.team_key = team_conferences.team_key
+    """
+
+    game = duckdb.query(query).df()
+    game['conference_week_key'] = conference_week_key(game['week_key'], game['conference'])
+    game = game.drop(columns=['conference', 'week_key'])
+    del calendar, team_conferences
+
+    # Team records above continue from the persisted standings; from here on only the open weeks are rebuilt.
+    # Weeks are keyed on the box-score gameDate (week_start below), so filter on that rather than game.gamedate.
+    budget.start('base: box scores join')
+    all_stats = pd.read_csv('player-statistics.csv')
+    n_box_scores = len(all_stats)
+    # The deji win pct standings continue from the state too, so they only need the box scores of the window
+    win_pct_since = history_start(state, 'win_pct_standings')
+    if win_pct_since is not None:
+        all_stats = all_stats[pd.to_datetime(all_stats['gameDate']) >= win_pct_since]
+    if until is not None:
+        all_stats = all_stats[pd.to_datetime(all_stats['gameDate']) < until]
+    all_stats = all_stats.assign(
+        team_key=team_key(all_stats['playerteamName'], teams),
+        opponent_team_key=team_key(all_stats['opponentteamName'], teams),
+        season=calendar_lookup(all_stats['gameDate'], ['season'])['season'],
+    )
+    stats = all_stats
+    if cutoff is not None:
+        stats = stats[pd.to_datetime(stats['gameDate']) >= cutoff]
+        game = game[game['gameId'].isin(stats['gameId'])]
+        print(f"Box scores: {len(stats)} of {n_box_scores} rows rebuilt, {len(all_stats)} read for the win pct standings")
+
+    query = """
+
+    SELECT game.*
+    ,pow_df.player_id
+    ,pow_df.player
+    ,pow_df.conference
+    ,pow_df.conference_key AS pow_conference_key
+    ,pow_df.date
+    ,pow_df.pow_filler
+    FROM game
+    JOIN pow_df
+    ON game.conference_week_key = pow_df.conference_week_key
+
+    """
+
+    combined_df = duckdb.query(query).df()
+
+    combined_df = combined_df.rename(columns={'player_id':'pow_player_id','player':'player_of_the_week','conference':'pow_conference','date':'pow_last_date_of_week'})
+    del game, pow_df
+    player_statistics_df = stats
+
+    player_statistics_df = player_statistics_df[['firstName', 'lastName', 'full_name', 'player_id', 'gameId', 'gameDate', 'playerteamName', 'team_key',
+    'numMinutes', 'points', 'assists',
+        'blocks', 'steals', 'fieldGoalsAttempted', 'fieldGoalsMade',
+        'fieldGoalsPercentage', 'threePointersAttempted', 'threePointersMade',
+        'threePointersPercentage', 'freeThrowsAttempted', 'freeThrowsMade',
+        'freeThrowsPercentage', 'reboundsDefensive', 'reboundsOffensive',
+        'reboundsTotal', 'foulsPersonal', 'turnovers', 'plusMinusPoints']]
+
+    query = """
+
+    SELECT *
+    FROM combined_df
+    LEFT JOIN player_statistics_df
+    ON combined_df.gameId = player_statistics_df.gameId AND combined_df.team_key = player_statistics_df.team_key
+    """
+
+    game_and_player_stats_df = duckdb.query(query).df()
+    # Remove any performances where the player did not play
+    query = """
+
+    SELECT *
+    FROM game_and_player_stats_df
+    WHERE numMinutes IS NOT NULL
+    """
+    game_and_player_stats_df = duckdb.query(query).df()
+    del combined_df, player_statistics_df
+
+    budget.start('base: seasons and award flags')
+    # Award flags are only joined to the rebuilt box scores; the season-tagged window feeds the deji win pct
+    player_statistics_test_df = all_stats
+    del all_stats
+
+    # Bring in all star, mvp and all-nba data
+    award_tables = read_award_tables()
+    award_bits_df = award_bits(award_tables)
+    first = award_tables['all_nba_first_team']
+    second = award_tables['all_nba_second_team']
+    third = award_tables['all_nba_third_team']
+
+    # Every award of a player-season comes in one join as a bitmask, decoded in the per-game rows below
+    query = """
+    SELECT
+    stats.firstName
+    ,stats.lastName
+    ,stats.full_name
+    ,stats.player_id
+    ,stats.gameId
+    ,CAST(stats.gameDate AS DATE) AS gameDate
+    ,stats.playerteamCity
+    ,stats.playerteamName
+    ,stats.team_key
+    ,stats.opponentteamCity
+    ,stats.opponentteamName
+    ,stats.gameType
+    ,stats.gameLabel
+    ,stats.gameSubLabel
+    ,stats.seriesGameNumber
+    ,stats.win
+    ,stats.home
+    ,stats.numMinutes
+    ,CAST(stats.points AS INT) AS points
+    ,CAST(stats.assists AS INT) AS assists
+    ,CAST(stats.blocks AS INT) AS blocks
+    ,CAST(stats.steals AS INT) AS steals
+    ,CAST(stats.fieldGoalsAttempted AS INT) AS fieldGoalsAttempted
+    ,CAST(stats.fieldGoalsMade AS INT) AS fieldGoalsMade
+    ,stats.fieldGoalsPercentage
+    ,CAST(stats.threePointersAttempted AS INT) AS threePointersAttempted
+    ,CAST(stats.threePointersMade AS INT) AS threePointersMade
+    ,stats.threePointersPercentage
+    ,CAST(stats.freeThrowsAttempted AS INT) AS freeThrowsAttempted
+    ,CAST(stats.freeThrowsMade AS INT) AS freeThrowsMade
+    ,stats.freeThrowsPercentage
+    ,CAST(stats.reboundsDefensive AS INT) AS reboundsDefensive
+    ,CAST(stats.reboundsOffensive AS INT) AS reboundsOffensive
+    ,CAST(stats.reboundsTotal AS INT) AS reboundsTotal
+    ,CAST(stats.foulsPersonal AS INT) AS foulsPersonal
+    ,CAST(stats.turnovers AS INT) AS turnovers
+    ,CAST(stats.plusMinusPoints AS INT) AS plusMinusPoints
+    ,stats.season
+    ,COALESCE(award_bits_df.awards, 0) AS awards
+
+    FROM stats
+    LEFT JOIN award_bits_df
+    ON award_bits_df.player_id = stats.player_id AND award_bits_df.season = stats.season
+    """
+    player_stats_with_allstar_mvp_allnba_df = duckdb.query(query).df()
+    del award_tables, award_bits_df
+
+    budget.start('base: per-game player rows')
+    query = f"""
+    SELECT
+    player_stats_with_allstar_mvp_allnba_df.gameId
+    ,player_stats_with_allstar_mvp_allnba_df.gamedate
+    ,day
+    ,week
+    ,month
+    ,year
+    ,team
+    ,game_and_player_stats_df.team_key
+    ,teamid
+    ,player_stats_with_allstar_mvp_allnba_df.firstName
+    ,player_stats_with_allstar_mvp_allnba_df.lastName
+    ,player_stats_with_allstar_mvp_allnba_df.full_name
+    ,player_stats_with_allstar_mvp_allnba_df.player_id
+    ,opponent
+    ,opponentid
+    ,outcome
+    ,player_stats_with_allstar_mvp_allnba_df.home as home
+    ,team_score
+    ,opp_score
+    ,games_prior
+    ,wins_prior
+    ,losses_prior
+    ,home_games_prior
+    ,home_wins_prior
+    ,home_losses_prior
+    ,away_games_prior
+    ,away_wins_prior
+    ,away_losses_prior
+    ,win_streak_prior
+    ,home_win_streak_prior
+    ,away_win_streak_prior
+    ,opp_wins_prior
+    ,opp_losses_prior
+    ,opp_winrate_prior
+    ,is_win_vs_over_500
+    ,wins_vs_over_500_prior
+    ,week_games_prior
+    ,week_wins_prior
+    ,week_losses_prior
+    ,player_stats_with_allstar_mvp_allnba_df.season
+    ,pow_player_id
+    ,player_of_the_week
+    ,pow_conference
+    ,pow_conference_key
+    ,pow_last_date_of_week
+    ,pow_filler
+    ,player_stats_with_allstar_mvp_allnba_df.numMinutes
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.points AS INT) AS points
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.assists AS INT) AS assists
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.blocks AS INT) AS blocks
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.steals AS INT) AS steals
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.fieldGoalsAttempted AS INT) AS fieldGoalsAttempted
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.fieldGoalsMade AS INT) AS fieldGoalsMade
+    ,player_stats_with_allstar_mvp_allnba_df.fieldGoalsPercentage
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.threePointersAttempted AS INT) AS threePointersAttempted
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.threePointersMade AS INT) AS threePointersMade
+    ,player_stats_with_allstar_mvp_allnba_df.threePointersPercentage
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.freeThrowsAttempted AS INT) AS freeThrowsAttempted
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.freeThrowsMade AS INT) AS freeThrowsMade
+    ,player_stats_with_allstar_mvp_allnba_df.freeThrowsPercentage
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.reboundsDefensive AS INT) AS reboundsDefensive
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.reboundsOffensive AS INT) AS reboundsOffensive
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.reboundsTotal AS INT) AS reboundsTotal
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.foulsPersonal AS INT) AS foulsPersonal
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.turnovers AS INT) AS turnovers
+    ,CAST(player_stats_with_allstar_mvp_allnba_df.plusMinusPoints AS INT) AS plusMinusPoints
+{award_flags_sql()}
+    FROM game_and_player_stats_df
+    JOIN player_stats_with_allstar_mvp_allnba_df
+    ON
+    (
+    game_and_player_stats_df.player_id = player_stats_with_allstar_mvp_allnba_df.player_id
+    AND
+    game_and_player_stats_df.gameId = player_stats_with_allstar_mvp_allnba_df.gameId
+    AND
+    game_and_player_stats_df.team_key = player_stats_with_allstar_mvp_allnba_df.team_key
+    )
+
+    """
+    overall_features_df = duckdb.query(query).df()
+    del game_and_player_stats_df
+
+    #Create target variable column for player of the week
+    overall_features_df["won_player_of_the_week"] = np.where(overall_features_df.pow_player_id == overall_features_df.player_id,1,0)
+
+    # Consider each player with respect to their conference. An Eastern Conference player is not eligible for Western Conference POW, and vice versa
+    team_conference_keys = team_conference_df.assign(team_key=team_key(team_conference_df['team_nickname'], teams))
+    query = """
+    SELECT overall_features_df.*
+    ,team_conference_keys.conference
+    ,team_conference_keys.team_nickname
+    FROM overall_features_df
+    JOIN team_conference_keys
+    ON overall_features_df.team_key = team_conference_keys.team_key AND overall_features_df.pow_conference_key = team_conference_keys.conference_key
+    """
+    overall_features_df = duckdb.query(query).df()
+    del team_conference_keys
+
+    wins_vs_all_nba_df = wins_vs_all_nba(first,second,third,stats)
+    del stats, first, second, third
+
+    query = """
+    SELECT overall_features_df.*
+    ,wins_vs_all_nba_df.win
+    ,wins_vs_all_nba_df.opponent_has_all_nba
+    ,wins_vs_all_nba_df.wins_vs_team_with_all_nba_player
+
+    FROM
+
+    overall_features_df
+    JOIN wins_vs_all_nba_df
+    ON (
+    overall_features_df.gameId = wins_vs_all_nba_df.game_id
+    AND
+    overall_features_df.player_id = wins_vs_all_nba_df.player_id
+    AND
+    overall_features_df.team_key = wins_vs_all_nba_df.team_key
+    )
+
+    """
+    overall_features_df = duckdb.query(query).df()
+    del wins_vs_all_nba_df, player_stats_with_allstar_mvp_allnba_df
+    overall_features_df['week_start'] = calendar_lookup(overall_features_df['gameDate'], ['week_start'])['week_start']
+    # Names are only carried for the output columns, dictionary-encoded
+    for col in ['team', 'team_nickname']:
+        overall_features_df[col] = overall_features_df[col].astype(team_dtype(teams))
+    for col in ['conference', 'pow_conference']:
+        overall_features_df[col] = overall_features_df[col].astype(CONFERENCE_DTYPE)
+    budget.finish()
+
+    return overall_features_df, player_statistics_test_df, team_standings
+
+
+def mode_rows(base_df, mode):
+    '''Rows of the shared base used by a mode: training leaves out the rows joined to a filler POW week.'''
+    if mode == 'training':
+        base_df = base_df[~base_df['pow_filler'].astype(bool)]
+    return base_df.drop(columns=['pow_filler'])
+
+
+def build_tables(overall_features_df, state=None):
+    '''
+    Builds the game-level and weekly feature tables from the per-game rows of one mode. The weekly table
+    carries the games_w_* threshold buckets; plain_tables() drops them for the overall feature set.
+
+    overall_features_df = mode_rows() of build_base()
+    state = the running state from feature_state.load_state(), or None for a full rebuild. The expanding
+            player stats and league stats continue from the persisted counts and sums.
+    Returns (overall_features_df, overall_weekly_agg_df, feat_rows, weekly_rows) where the last two are the
+    game-level and weekly rows before the first-week dropna, used to advance the state.
+    '''
+    # weekly team aggregates
+    team_week = (
+        overall_features_df.groupby(["team_key","season","week_start"], as_index=False)
+        .agg(team_pts=("points","sum"),
+            team_ast=("assists","sum"),
+            team_blk=("blocks","sum"),
+            team_stl=("steals","sum"),
+            team_gms=("gameId","nunique"))
+    )
+
+    # weekly playeraggregates
+    player_week = (
+        overall_features_df.groupby(["player_id","team_key","season","week_start","week"], as_index=False)
+        .agg(gms=("gameId","nunique"),
+            min_sum=("numMinutes","sum"),
+            pts_sum=("points","sum"),
+            ast_sum=("assists","sum"),
+            blk_sum=("blocks","sum"),
+            stl_sum=("steals","sum"),
+            pm_sum =("plusMinusPoints","sum"),
+            pm_mean=("plusMinusPoints","mean"),
+            wins=("win","sum"))
+    )
+
+    feat = player_week.merge(
+        team_week,
+        on=["team_key","season","week_start"],
+        how="inner"
+    )
+    del player_week, team_week
+
+    # Z-score breakout features
+    # Tie-break on team so players traded mid-week get the same row order on every run
+    feat = feat.sort_values(["player_id","season","week_start","team_key"])
+    feat = shifted_expanding_moments(feat, ["player_id","season"], ["pts_sum","ast_sum","pm_sum"],
+                                     prior=state['player_game_moments'] if state is not None else None)
+    feat_rows = feat
+    feat = feat.dropna() #Null rows represent the first week of the season, aka no rolling average to look at
+
+    query = """
+    SELECT * FROM
+    overall_features_df
+    JOIN feat
+    ON (
+    overall_features_df.player_id = feat.player_id
+    AND
+    overall_features_df.week_start = feat.week_start
+    AND
+    overall_features_df.team_key = feat.team_key
+    )
+    """
+
+    overall_features_df = duckdb.query(query).df()
+    del feat
+
+    overall_features_df = overall_features_df[[
+        'gameId', 'gameDate', 'day', 'week', 'month', 'year', 'team', 'teamid',
+        'firstName', 'lastName', 'full_name', 'player_id', 'opponent', 'opponentid',
+        'outcome', 'home', 'team_score', 'opp_score', 'games_prior', 'wins_prior',
+        'losses_prior', 'home_games_prior', 'home_wins_prior',
+        'home_losses_prior', 'away_games_prior', 'away_wins_prior',
+        'away_losses_prior', 'win_streak_prior', 'home_win_streak_prior',
+        'away_win_streak_prior', 'opp_wins_prior', 'opp_losses_prior', 'opp_winrate_prior',
+        'is_win_vs_over_500', 'wins_vs_over_500_prior', 'week_games_prior', 'week_wins_prior',
+        'week_losses_prior', 'season', 'pow_player_id',
+        'player_of_the_week', 'pow_conference', 'pow_last_date_of_week', 'numMinutes',
+        'points', 'assists', 'blocks', 'steals', 'fieldGoalsAttempted', 'fieldGoalsMade',
+        'fieldGoalsPercentage', 'threePointersAttempted', 'threePointersMade',
+        'threePointersPercentage', 'freeThrowsAttempted', 'freeThrowsMade',
+        'freeThrowsPercentage', 'reboundsDefensive', 'reboundsOffensive', 'reboundsTotal',
+        'foulsPersonal', 'turnovers', 'plusMinusPoints', 'all_star_this_season',
+        'mvp_this_season', 'all_nba_first_team_this_season',
+        'all_nba_second_team_this_season', 'all_nba_third_team_this_season',
+        'won_player_of_the_week', 'conference', 'team_nickname', 'win',
+        'opponent_has_all_nba', 'wins_vs_team_with_all_nba_player', 'week_start',
+        'gms', 'min_sum', 'pts_sum', 'ast_sum', 'blk_sum', 'stl_sum', 'pm_sum',
+        'pm_mean', 'wins', 'team_pts', 'team_ast', 'team_blk', 'team_stl', 'team_gms',
+        'pts_sum_mean_season', 'pts_sum_std_season', 'ast_sum_mean_season',
+        'ast_sum_std_season', 'pm_sum_mean_season', 'pm_sum_std_season'
+        ]]
+
+    query = """
+    SELECT
+    player_id
+    ,full_name
+    ,team
+    ,season
+    ,week
+    ,week_start
+    ,conference
+    ,pow_conference
+    ,COUNT(DISTINCT gameId) AS games_played_this_week
+    ,SUM(numMinutes) AS numMinutes
+    ,SUM(points) AS points
+    ,SUM(assists) AS assists
+    ,SUM(blocks) AS blocks
+    ,SUM(steals) AS steals
+    ,SUM(reboundsTotal) AS reboundsTotal
+    ,SUM(reboundsDefensive) AS reboundsDefensive
+    ,SUM(reboundsOffensive) AS reboundsOffensive
+    ,SUM(fieldGoalsAttempted) AS fieldGoalsAttempted
+    ,SUM(fieldGoalsMade) AS fieldGoalsMade
+    ,SUM(threePointersAttempted) AS threePointersAttempted
+    ,SUM(threePointersMade) AS threePointersMade
+    ,SUM(freeThrowsAttempted) AS freeThrowsAttempted
+    ,SUM(freeThrowsMade) AS freeThrowsMade
+    ,SUM(turnovers) AS turnovers
+    ,SUM(foulsPersonal) AS foulsPersonal
+    ,SUM(plusMinusPoints) AS plusMinusPoints
+    ,SUM(win) AS wins_this_week
+    ,SUM(wins_vs_team_with_all_nba_player) AS wins_vs_team_with_all_nba_player
+    ,SUM(is_win_vs_over_500) AS is_win_vs_over_500
+    ,SUM(opponent_has_all_nba) AS opponent_has_all_nba
+    ,AVG(opp_score) AS avg_opp_score
+    ,AVG(opp_winrate_prior) AS avg_opp_winrate_prior
+    ,AVG(opp_wins_prior) AS avg_opp_wins_prior
+    ,AVG(opp_losses_prior) AS avg_opp_losses_prior
+    ,MAX(away_games_prior) AS away_games_prior
+    ,MAX(away_losses_prior) AS away_losses_prior
+    ,MAX(away_win_streak_prior) AS away_win_streak_prior
+    ,MAX(away_wins_prior) AS away_wins_prior
+    ,MAX(home_games_prior) AS home_games_prior
+    ,MAX(home_losses_prior) AS home_losses_prior
+    ,MAX(home_win_streak_prior) AS home_win_streak_prior
+    ,MAX(home_wins_prior) AS home_wins_prior
+    ,MAX(losses_prior) AS losses_prior
+    ,MAX(wins_vs_over_500_prior) AS wins_vs_over_500_prior
+    ,MAX(won_player_of_the_week) AS won_player_of_the_week
+    ,MAX(all_star_this_season) AS all_star_this_season
+    ,MAX(mvp_this_season) AS mvp_this_season
+    ,MAX(all_nba_first_team_this_season) AS all_nba_first_team_this_season
+    ,MAX(all_nba_second_team_this_season) AS all_nba_second_team_this_season
+    ,MAX(all_nba_third_team_this_season) AS all_nba_third_team_this_season
+    ,MAX(team_pts) AS team_pts
+    ,MAX(team_ast) AS team_ast
+    ,MAX(team_blk) AS team_blk
+    ,MAX(team_stl) AS team_stl
+    ,MAX(team_gms) AS team_gms
+    ,MAX(pow_player_id) AS pow_player_id
+    ,MAX(player_of_the_week) AS player_of_the_week
+
+    FROM overall_features_df
+    GROUP BY player_id, full_name, team, season, week, week_start, conference, pow_conference
+    ORDER BY player_id, season, week_start, week, team, pow_conference
+    """
+    overall_weekly_agg_df = duckdb.query(query).df()
+    # Threshold bucket counts (games_w_*), see bucket_features.GAME_STAT_BUCKETS
+    overall_weekly_agg_df = add_bucket_counts(
+        overall_weekly_agg_df, overall_features_df,
+        ["player_id", "full_name", "team", "season", "week", "week_start", "conference", "pow_conference"],
+        after="points",
+    )
+    overall_weekly_agg_df['fieldGoalsPercentage'] = np.where(overall_weekly_agg_df['fieldGoalsAttempted'] > 0, overall_weekly_agg_df['fieldGoalsMade'] / overall_weekly_agg_df['fieldGoalsAttempted'], 0)
+    overall_weekly_agg_df['threePointersPercentage'] = np.where(overall_weekly_agg_df['threePointersAttempted'] > 0, overall_weekly_agg_df['threePointersMade'] / overall_weekly_agg_df['threePointersAttempted'], 0)
+    overall_weekly_agg_df['freeThrowsPercentage'] = np.where(overall_weekly_agg_df['freeThrowsAttempted'] > 0, overall_weekly_agg_df['freeThrowsMade'] / overall_weekly_agg_df['freeThrowsAttempted'], 0)
+
+    # Recalculate rolling averages on weekly level
+    overall_weekly_agg_df = shifted_expanding_moments(overall_weekly_agg_df, ["player_id", "season"], ["points", "assists", "plusMinusPoints"],
+                                                      prior=state['player_week_moments'] if state is not None else None)
+    weekly_rows = overall_weekly_agg_df
+
+    # Nulls here represent a player's first week of the season, therefore he has no rolling averages yet. Drop nulls.
+    overall_weekly_agg_df = overall_weekly_agg_df.dropna(subset=['points_mean_season'])
+
+    # Calculate z-scores and breakout score for the weekly aggregate
+    overall_weekly_agg_df["z_pts"] = zscore(overall_weekly_agg_df["points"], overall_weekly_agg_df["points_mean_season"], overall_weekly_agg_df["points_std_season"])
+    overall_weekly_agg_df["z_ast"] = zscore(overall_weekly_agg_df["assists"], overall_weekly_agg_df["assists_mean_season"], overall_weekly_agg_df["assists_std_season"])
+    overall_weekly_agg_df["z_pm"] = zscore(overall_weekly_agg_df["plusMinusPoints"], overall_weekly_agg_df["plusMinusPoints_mean_season"], overall_weekly_agg_df["plusMinusPoints_std_season"])
+    overall_weekly_agg_df["breakout_score"] = (0.5 * overall_weekly_agg_df["z_pts"] + 0.3 * overall_weekly_agg_df["z_ast"] + 0.2 * overall_weekly_agg_df["z_pm"])
+
+    ##############################################################################################################
+    # Adding new features on 12/3/25 #
+    overall_weekly_agg_df = overall_weekly_agg_df.sort_values(["season", "week"], ignore_index=True)
+    # Compute league-wide stats per season, continuing from the frozen weeks in the state
+    league_moments = group_moments(overall_weekly_agg_df, ["season"], ["points", "assists", "plusMinusPoints"])
+    if state is not None:
+        league_moments = combine_moments(state['league_season_moments'], league_moments, ["season"], ["points", "assists", "plusMinusPoints"])
+    # z-scores against the previous season's league-wide stats; first-season rows have none and get 0
+    overall_weekly_agg_df = normalize_by_lagged_group(
+        overall_weekly_agg_df, "season", ["points", "assists", "plusMinusPoints"], league_moments, lag=1, ddof=1,
+        stat_names={"points": ("league_pts_mean", "league_pts_std"),
+                    "assists": ("league_ast_mean", "league_ast_std"),
+                    "plusMinusPoints": ("league_pm_mean", "league_pm_std")},
+        z_names={"points": "z_s_pts", "assists": "z_s_ast", "plusMinusPoints": "z_s_pm"},
+    )
+    del league_moments
+
+    ###################################################################################################
+
+    return overall_features_df, overall_weekly_agg_df, feat_rows, weekly_rows
+
+
+
+
+# "W-L" record strings of the game-level output, built from their win and loss counts when the files are written.
+# Each goes right after its losses column. (record column, wins column, losses column)
+RECORD_COLUMNS = [
+    ('record_prior', 'wins_prior', 'losses_prior'),
+    ('home_record_prior', 'home_wins_prior', 'home_losses_prior'),
+    ('away_record_prior', 'away_wins_prior', 'away_losses_prior'),
+    ('week_record_prior', 'week_wins_prior', 'week_losses_prior'),
+]
+
+
+def add_record_strings(overall_features_df):
+    '''Adds the RECORD_COLUMNS to a game-level table, in place. Returns the table.'''
+    for record, wins, losses in RECORD_COLUMNS:
+        records = overall_features_df[wins].astype(str) + '-' + overall_features_df[losses].astype(str)
+        overall_features_df.insert(overall_features_df.columns.get_loc(losses) + 1, record, records)
+    return overall_features_df
+
+
+def plain_tables(overall_features_df, overall_weekly_agg_df):
+    '''The overall feature set: the tables from build_tables() without the deji threshold buckets.'''
+    bucket_cols = [c for stat, edges in GAME_STAT_BUCKETS for c in bucket_column_names(stat, edges)]
+    return overall_features_df, overall_weekly_agg_df.drop(columns=bucket_cols)
+
+
+## 12/22/2025:  Add intra-week win pct features
+def build_win_pct_weekly(player_statistics_test_df, standings=None, weeks_from=None):
+    '''
+    Intra-week win pct features: each team's regular-season win pct after every game of a week, averaged over
+    the week, and its spread (max - min) within the week.
+
+    player_statistics_test_df = season-tagged box scores from build_base()
+    standings = win pct standings returned by an earlier call, or None to compute every team-season
+    weeks_from = only aggregate the weeks starting on or after this Monday; the standings still cover every game
+    Returns (weekly win pct per team, season, week_start and conference, updated standings to persist)
+    '''
+    query = """
+    WITH CTE AS (
+    SELECT DISTINCT
+    gameId
+    ,gameDate
+    ,playerteamCity AS city
+    ,playerteamName AS team
+    ,season
+    ,win
+    FROM player_statistics_test_df
+
+    )
+
+    ,Game_Type_Lookup AS (
+
+      SELECT gameId, gameDate, gameType FROM games.csv
+    )
+
+    ,CTE3 AS(
+    SELECT CTE.*
+    ,CASE
+          WHEN season < 2025 THEN Game_Type_Lookup.gameType
+          WHEN CTE.gameDate < '2025-10-21' THEN 'Preseason'
+          ELSE 'Regular Season'
+    END AS gameType
+    FROM CTE
+    JOIN Game_Type_Lookup
+    ON CTE.gameId = Game_Type_Lookup.gameId
+    )
+
+    SELECT gameId
+    ,CAST(gameDate AS DATE) AS gameDate
+    ,city
+    ,team
+    ,season
+    ,win AS is_win
+    FROM CTE3
+    WHERE gameType = 'Regular Season'
+    AND win IS NOT NULL
+    """
+    events = duckdb.query(query).df()
+    # One conference per team: the nickname alone is ambiguous (Charlotte vs New Orleans Hornets)
+    events['conference'] = team_conference(events.pop('city'), events['team'])
+    events = events[events['conference'].notna()]
+
+    # Running win pct per team-season, including the game itself
+    def season_records(events):
+        return running_standings(events, ['team', 'season'], ['gameDate', 'gameId'], home=False, streaks=False)
+
+    standings = update_standings(standings, events, ['gameId', 'team'], ['team', 'season'], season_records)
+    win_pct_df = standings[['gameId', 'gameDate', 'team', 'season', 'conference']].copy()
+    win_pct_df['win_pct'] = (standings['wins_prior'] + standings['is_win']) / (standings['games_prior'] + 1)
+    win_pct_df['week_start'] = calendar_lookup(win_pct_df['gameDate'], ['week_start'])['week_start']
+    if weeks_from is not None:
+        win_pct_df = win_pct_df[win_pct_df['week_start'] >= weeks_from]
+
+    query = """
+    SELECT
+    team
+    ,season
+    ,conference
+    ,week_start
+    ,AVG(win_pct) AS avg_full_season_win_pct_this_week
+    ,MAX(win_pct) - MIN(win_pct) AS full_season_win_pct_max_minus_min_this_week
+    FROM win_pct_df
+    GROUP BY team, season, week_start, conference
+    ORDER BY team, season, week_start, conference
+    """
+    return duckdb.query(query).df(), standings
+
+
+## 12/22/2025: Add prior-season awards
+def build_past_player_awards():
+    '''Prior-season award flags from the award CSVs, indexed by player_season_key(); see award_dim.lagged_awards().'''
+    return lagged_awards(award_bits())
+
+
+def add_past_player_awards(df, past_player_awards_df):
+    '''Adds the {award}_last_season columns to a feature table, 0 for player-seasons without prior-season awards.'''
+    df = df.copy()
+    key = player_season_key(df['player_id'], df['season'])
+    last_season = past_player_awards_df.reindex(key).fillna(0)
+    for col in last_season.columns:
+        df[col] = last_season[col].to_numpy()
+    return df
+
+
+def deji_tables(overall_features_df, overall_weekly_agg_df, win_pct_weekly_agg_df, past_player_awards_df):
+    '''The deji feature set: the tables from build_tables() plus intra-week win pct and prior-season awards.'''
+    add_win_pct_columns = pd.merge(overall_weekly_agg_df,win_pct_weekly_agg_df,how='left',on=['team','season','week_start','conference'])
+    add_win_pct_columns = add_win_pct_columns.fillna({'avg_full_season_win_pct_this_week':add_win_pct_columns['avg_full_season_win_pct_this_week'].mean(), 'full_season_win_pct_max_minus_min_this_week':add_win_pct_columns['full_season_win_pct_max_minus_min_this_week'].mean()})
+    overall_weekly_agg_df = add_win_pct_columns
+
+    overall_features_df = add_past_player_awards(overall_features_df, past_player_awards_df)
+    overall_weekly_agg_df = add_past_player_awards(overall_weekly_agg_df, past_player_awards_df)
+    return overall_features_df, overall_weekly_agg_df
+
+
+def build_inference_week(state, week_start, feature_sets=FEATURE_SETS, budget=None):
+    '''
+    Weekly inference rows of a single week, e.g. the current week right after its games are in, without a full run.
+
+    state = the running state from feature_state.load_state(). Only the games from its cutoff to the end of the
+            week are joined; the expanding player and league statistics, team standings and prior-season awards
+            come from the state.
+    week_start = Monday of the week to build; must not be before state['cutoff'] (frozen weeks are in the feature store)
+    feature_sets = feature sets to build
+    budget = MemoryBudget that records each step
+    Returns {feature_set: weekly table of that week}. The deji win pct fill values are the mean of that week only.
+    '''
+    budget = budget or NoBudget()
+    if week_start < state['cutoff']:
+        raise ValueError(f"Week of {week_start.date()} is before the feature state cutoff {state['cutoff'].date()}; "
+                         "read it from the feature store instead")
+
+    # Later weeks cannot change this week's rows: the expanding statistics only look back, so nothing after the
+    # week is read. Before the cutoff, only the seasons the standings still need are read (history_start()).
+    base_df, player_statistics_test_df, _ = build_base(state, True, budget, until=week_start + pd.Timedelta(days=7))
+    base_df = base_df[base_df['week_start'] <= week_start]
+    if 'deji' in feature_sets:
+        budget.start('deji win pct and prior-season awards')
+        win_pct_weekly_agg_df, _ = build_win_pct_weekly(player_statistics_test_df, state['win_pct_standings'],
+                                                        weeks_from=week_start)
+        past_player_awards_df = build_past_player_awards()
+    del player_statistics_test_df
+
+    budget.start('inference week tables')
+    overall_features_df, overall_weekly_agg_df, _, _ = build_tables(mode_rows(base_df, 'inference'), state)
+    del base_df
+    overall_features_df = add_record_strings(overall_features_df[overall_features_df['week_start'] == week_start].copy())
+    overall_weekly_agg_df = overall_weekly_agg_df[overall_weekly_agg_df['week_start'] == week_start].reset_index(drop=True)
+
+    weeks = {}
+    for feature_set in feature_sets:
+        if feature_set == 'deji':
+            _, weeks[feature_set] = deji_tables(overall_features_df, overall_weekly_agg_df, win_pct_weekly_agg_df, past_player_awards_df)
+        else:
+            _, weeks[feature_set] = plain_tables(overall_features_df, overall_weekly_agg_df)
+    budget.finish()
+    return weeks
+
+
+def remove_inputs(include_filler_weeks):
+    # Delete CSV files
+    os.remove('nba-all-stars.csv')
+    os.remove('nba-mvp.csv')
+    os.remove('all-nba-first-team.csv')
+    os.remove('all-nba-second-team.csv')
+    os.remove('all-nba-third-team.csv')
+    os.remove('player-of-the-week.csv')
+    os.remove('player-statistics.csv')
+    os.remove('games.csv')
+    if include_filler_weeks:
+        os.remove('player-of-the-week-for-inference.csv')
+
+
+def upload_outputs(filenames):
+    # Local features_overall_weekly_deji.csv goes to nba_data/features-overall-weekly-deji.csv
+    credentials_path = 'cis-5450-final-project-485661e2f371.json'
+    try:
+        storage_client = storage.Client.from_service_account_json(credentials_path)
+        bucket_name = 'nba_award_predictor'
+        bucket = storage_client.bucket(bucket_name)
+        for filename in filenames:
+            blob = bucket.blob('nba_data/' + filename.replace('_', '-'))
+            blob.cache_control = "max-age=0"
+            blob.upload_from_filename(filename)
+    except:
+        print("File saved locally but not uploaded to GCS (Hint: check for json credentials file)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the features_overall tables for every mode and feature set")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--feature-sets', nargs='+', choices=FEATURE_SETS, default=FEATURE_SETS)
+    parser.add_argument('--build', choices=['incremental', 'full', 'verify'], default='incremental',
+                        help="incremental: rebuild only the open weeks from the persisted feature state (falls back to full "
+                             "when there is none). full: rebuild every week since 1979. verify: full rebuild, then rebuild the "
+                             "last --verify-weeks weeks incrementally and check both give the same training tables.")
+    parser.add_argument('--verify-weeks', type=int, default=3)
+    parser.add_argument('--memory-budget', type=parse_size, default=None,
+                        help="e.g. 2GB. Defaults to 75%% of the container's memory limit.")
+    parser.add_argument('--spill-dir', default='spill', help="local directory DuckDB and parked tables spill to")
+    parser.add_argument('--week', type=pd.Timestamp, default=None,
+                        help="any date in the week to build, e.g. 2026-03-16. Only builds that week's inference rows from "
+                             "the persisted feature state (features_overall_weekly_for_inference*_week.csv) and leaves the "
+                             "state and the full tables as they are.")
+    args = parser.parse_args()
+
+    budget = MemoryBudget(args.memory_budget, args.spill_dir)
+
+    budget.start('download inputs')
+    download_inputs()
+    include_filler_weeks = 'inference' in args.modes or args.week is not None
+    if include_filler_weeks:
+        # Writes player-of-the-week-for-inference.csv
+        budget.start('filler POW weeks')
+        create_data_for_realtime_inference()
+
+    if args.week is not None:
+        budget.start('load feature state')
+        state = feature_state.load_state()
+        if state is None:
+            raise SystemExit("--week needs a persisted feature state, run a full or incremental build first")
+        week_start = calendar_lookup(pd.Series([args.week]), ['week_start'])['week_start'].iloc[0]
+        print(f"Building the inference rows of the week of {week_start.date()}")
+        weeks = build_inference_week(state, week_start, args.feature_sets, budget)
+        output_files = []
+        for feature_set, weekly_df in weeks.items():
+            filename = f"features_overall_weekly{OUTPUT_SUFFIXES[('inference', feature_set)]}_week.csv"
+            weekly_df.to_csv(filename, index=False)
+            output_files.append(filename)
+        remove_inputs(include_filler_weeks)
+        budget.start('upload outputs')
+        upload_outputs(output_files)
+        budget.report()
+        raise SystemExit(0)
+
+    budget.start('load feature state')
+    state = None
+    if args.build == 'incremental':
+        state = feature_state.load_state()
+        if state is None:
+            print("No feature state found, running a full rebuild")
+        else:
+            print(f"Rebuilding weeks starting on or after {state['cutoff'].date()}")
+
+    # Shared base, built once for every mode and feature set
+    base_df, player_statistics_test_df, team_standings = build_base(state, include_filler_weeks, budget)
+    standings = {'team_standings': team_standings}
+
+    # The deji lookups are the last use of the full box-score copies, so build them now and let those go
+    if 'deji' in args.feature_sets:
+        budget.start('deji win pct and prior-season awards')
+        win_pct_weekly_agg_df, standings['win_pct_standings'] = build_win_pct_weekly(
+            player_statistics_test_df, state['win_pct_standings'] if state is not None else None)
+        past_player_awards_df = build_past_player_awards()
+    del player_statistics_test_df
+    gc.collect()
+
+    # The training tables always get built: they are what the feature state is advanced with
+    budget.start('training tables')
+    overall_features_df, overall_weekly_agg_df, feat_rows, weekly_rows = build_tables(mode_rows(base_df, 'training'), state)
+
+    if args.build == 'verify':
+        # Freeze everything before the last few weeks, rebuild those weeks from the frozen state and compare
+        budget.start('verify incremental rebuild')
+        week_starts = sorted(overall_weekly_agg_df['week_start'].unique())
+        check_cutoff = pd.Timestamp(week_starts[-args.verify_weeks])
+        check_state = feature_state.advance_state(None, check_cutoff, feat_rows, weekly_rows, overall_features_df, overall_weekly_agg_df)
+        # Standings as of the cutoff too, so the rebuild also goes through the incremental standings update
+        check_state['team_standings'] = team_standings[team_standings['gamedate'].dt.tz_localize(None) < check_cutoff]
+        check_base_df, _, _ = build_base(check_state)
+        incremental_features_df, incremental_weekly_df, _, _ = build_tables(mode_rows(check_base_df, 'training'), check_state)
+        del check_base_df
+        incremental_features_df, incremental_weekly_df = feature_state.assemble_outputs(check_state, incremental_features_df, incremental_weekly_df)
+        features_match = feature_state.compare_outputs(overall_features_df, incremental_features_df, 'features_overall')
+        weekly_match = feature_state.compare_outputs(overall_weekly_agg_df, incremental_weekly_df, 'features_overall_weekly')
+        if not (features_match and weekly_match):
+            raise SystemExit(1)
+        del check_state, incremental_features_df, incremental_weekly_df
+        gc.collect()
+
+    # Persist the advanced state right away; it holds a full copy of the frozen weeks
+    budget.start('save feature state')
+    new_cutoff = feature_state.next_cutoff(state, overall_weekly_agg_df)
+    new_state = feature_state.advance_state(state, new_cutoff, feat_rows, weekly_rows, overall_features_df, overall_weekly_agg_df, standings)
+    del feat_rows, weekly_rows, team_standings, standings
+    feature_state.save_state(new_state)
+    del new_state
+    gc.collect()
+
+    budget.start('assemble training tables')
+    tables = {}
+    overall_features_df, overall_weekly_agg_df = feature_state.assemble_outputs(state, overall_features_df, overall_weekly_agg_df)
+    tables['training'] = (budget.park(overall_features_df, 'training_features'), budget.park(overall_weekly_agg_df, 'training_weekly'))
+    del overall_features_df, overall_weekly_agg_df
+    gc.collect()
+
+    if 'inference' in args.modes:
+        # The inference tables share the frozen weeks of the training tables and only differ in the open weeks.
+        # A full rebuild can also hold filler-week rows from before the cutoff: games whose parsed game date
+        # (day and month swapped by build_team_games) lands in a filler week. Incremental runs leave those out.
+        budget.start('inference tables')
+        overall_features_df, overall_weekly_agg_df, _, _ = build_tables(mode_rows(base_df, 'inference'), state)
+        overall_features_df, overall_weekly_agg_df = feature_state.assemble_outputs(state, overall_features_df, overall_weekly_agg_df)
+        tables['inference'] = (budget.park(overall_features_df, 'inference_features'), budget.park(overall_weekly_agg_df, 'inference_weekly'))
+        del overall_features_df, overall_weekly_agg_df
+    del base_df, state
+    gc.collect()
+
+    # Save output to CSV
+    output_files = []
+    store_tables = []
+    for mode in args.modes:
+        budget.start(f'write {mode} outputs')
+        parked_features, parked_weekly = tables.pop(mode)
+        mode_features_df, mode_weekly_df = parked_features.get(), parked_weekly.get()
+        mode_features_df = add_record_strings(mode_features_df)
+        for feature_set in args.feature_sets:
+            if feature_set == 'deji':
+                features_df, weekly_df = deji_tables(mode_features_df, mode_weekly_df, win_pct_weekly_agg_df, past_player_awards_df)
+            else:
+                features_df, weekly_df = plain_tables(mode_features_df, mode_weekly_df)
+            suffix = OUTPUT_SUFFIXES[(mode, feature_set)]
+            features_df.to_csv(f'features_overall{suffix}.csv',index=False)
+            weekly_df.to_csv(f'features_overall_weekly{suffix}.csv',index=False)
+            output_files += [f'features_overall{suffix}.csv', f'features_overall_weekly{suffix}.csv']
+            # Same weekly table in the partitioned Parquet store, for readers that only need some weeks
+            feature_store.write_table(weekly_df, f'features_overall_weekly{suffix}')
+            store_tables.append(f'features_overall_weekly{suffix}')
+            del features_df, weekly_df
+        parked_features.release()
+        parked_weekly.release()
+        del parked_features, parked_weekly, mode_features_df, mode_weekly_df
+        gc.collect()
+
+    remove_inputs(include_filler_weeks)
+
+    # Upload to GCS
+    budget.start('upload outputs')
+    upload_outputs(output_files)
+    for table in store_tables:
+        feature_store.upload_table(table)
+    budget.report()
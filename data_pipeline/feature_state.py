@@ -0,0 +1,181 @@
+import json
+import os
+import pandas as pd
+from google.cloud import storage
+from grouped_moments import group_moments, combine_moments
+
+# Running state for the incremental weekly feature build.
+#
+# Everything before `cutoff` (the Monday of the first week that can still change) is frozen:
+#   player_game_moments   per (player_id, season) counts and sums of the weekly pts/ast/pm totals
+#                         behind the game-level *_mean_season / *_std_season columns
+#   player_week_moments   the same for the weekly table's points/assists/plusMinusPoints
+#   league_season_moments per season counts and sums behind the league z-scores
+#   features_overall / features_overall_weekly   the training rows for the frozen weeks, as built by
+#                         feature_engine.build_tables() (weekly rows still carry the games_w_* buckets)
+# An incremental run only rebuilds rows from `cutoff` onwards and appends them to the frozen rows.
+#
+# The team standings are kept per game rather than per week (team_standings.update_standings() recomputes the
+# team-seasons that got a new game):
+#   team_standings        team records behind build_team_games()
+#   win_pct_standings     regular-season records behind the deji win pct features (only kept when they are built)
+
+STATE_DIR = 'feature_state'
+STATE_VERSION = 6
+GCS_PREFIX = 'nba_data/feature_state/'
+CREDENTIALS_PATH = 'cis-5450-final-project-485661e2f371.json'
+BUCKET_NAME = 'nba_award_predictor'
+
+PLAYER_KEYS = ['player_id', 'season']
+GAME_MOMENT_COLS = ['pts_sum', 'ast_sum', 'pm_sum']
+WEEK_MOMENT_COLS = ['points', 'assists', 'plusMinusPoints']
+
+TABLES = ['player_game_moments', 'player_week_moments', 'league_season_moments',
+          'features_overall', 'features_overall_weekly']
+STANDINGS_TABLES = ['team_standings', 'win_pct_standings']
+
+
+def empty_state():
+    return {'cutoff': None, **{name: None for name in TABLES + STANDINGS_TABLES}}
+
+
+def load_state(state_dir=STATE_DIR, from_gcs=True):
+    '''
+    Load the persisted state, pulling it from GCS first when available.
+    Returns None when there is no usable state (missing, or written by an older STATE_VERSION),
+    in which case the caller should do a full rebuild.
+    '''
+    if from_gcs:
+        download_state(state_dir)
+
+    manifest_path = os.path.join(state_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != STATE_VERSION or manifest.get('cutoff') is None:
+        return None
+
+    state = {'cutoff': pd.Timestamp(manifest['cutoff'])}
+    for name in TABLES:
+        state[name] = pd.read_parquet(os.path.join(state_dir, f'{name}.parquet'))
+    for name in STANDINGS_TABLES:
+        path = os.path.join(state_dir, f'{name}.parquet')
+        state[name] = pd.read_parquet(path) if os.path.exists(path) else None
+    return state
+
+
+def save_state(state, state_dir=STATE_DIR, to_gcs=True):
+    os.makedirs(state_dir, exist_ok=True)
+    for name in TABLES:
+        state[name].to_parquet(os.path.join(state_dir, f'{name}.parquet'), index=False)
+    for name in STANDINGS_TABLES:
+        if state.get(name) is not None:
+            state[name].to_parquet(os.path.join(state_dir, f'{name}.parquet'), index=False)
+    with open(os.path.join(state_dir, 'manifest.json'), 'w') as f:
+        json.dump({'version': STATE_VERSION, 'cutoff': str(state['cutoff'].date())}, f)
+    if to_gcs:
+        upload_state(state_dir)
+
+
+def download_state(state_dir=STATE_DIR):
+    try:
+        storage_client = storage.Client.from_service_account_json(CREDENTIALS_PATH)
+        bucket = storage_client.bucket(BUCKET_NAME)
+        os.makedirs(state_dir, exist_ok=True)
+        for blob in bucket.list_blobs(prefix=GCS_PREFIX):
+            blob.download_to_filename(os.path.join(state_dir, os.path.basename(blob.name)))
+    except:
+        print("Feature state not downloaded from GCS, using local copy if present (Hint: check for json credentials file)")
+
+
+def upload_state(state_dir=STATE_DIR):
+    try:
+        storage_client = storage.Client.from_service_account_json(CREDENTIALS_PATH)
+        bucket = storage_client.bucket(BUCKET_NAME)
+        for filename in os.listdir(state_dir):
+            blob = bucket.blob(GCS_PREFIX + filename)
+            blob.cache_control = "max-age=0"
+            blob.upload_from_filename(os.path.join(state_dir, filename))
+    except:
+        print("Feature state saved locally but not uploaded to GCS (Hint: check for json credentials file)")
+
+
+def next_cutoff(state, weekly_df):
+    '''
+    A week is frozen once a later week has rows in the weekly table, i.e. its Player of the Week
+    has been announced and the data has moved on. The latest week always stays open.
+    '''
+    old_cutoff = state['cutoff'] if state is not None else None
+    if len(weekly_df) == 0:
+        return old_cutoff
+    latest = pd.Timestamp(weekly_df['week_start'].max())
+    if old_cutoff is not None and latest < old_cutoff:
+        return old_cutoff
+    return latest
+
+
+def assemble_outputs(state, features_df, weekly_df):
+    '''Frozen rows from the state followed by the rows rebuilt in this run.'''
+    if state is None:
+        return features_df, weekly_df
+    features_df = pd.concat([state['features_overall'], features_df], ignore_index=True)
+    weekly_df = pd.concat([state['features_overall_weekly'], weekly_df], ignore_index=True)
+    return features_df, weekly_df
+
+
+def advance_state(state, cutoff, feat_rows, weekly_rows, features_df, weekly_df, standings=None):
+    '''
+    Fold every row of this run that falls before the new cutoff into the state.
+
+    feat_rows, weekly_rows = game-level and weekly rows *before* the first-week dropna; these feed
+                             the expanding player moments
+    features_df, weekly_df = this run's output rows; weekly_df also feeds the league moments
+    standings = {name: standings} for the STANDINGS_TABLES updated this run; the others are carried over
+    '''
+    if state is None:
+        state = empty_state()
+
+    def closed(df):
+        return df[pd.to_datetime(df['week_start']) < cutoff]
+
+    new_state = {'cutoff': cutoff}
+    new_state['player_game_moments'] = combine_moments(
+        state['player_game_moments'], group_moments(closed(feat_rows), PLAYER_KEYS, GAME_MOMENT_COLS),
+        PLAYER_KEYS, GAME_MOMENT_COLS)
+    new_state['player_week_moments'] = combine_moments(
+        state['player_week_moments'], group_moments(closed(weekly_rows), PLAYER_KEYS, WEEK_MOMENT_COLS),
+        PLAYER_KEYS, WEEK_MOMENT_COLS)
+    new_state['league_season_moments'] = combine_moments(
+        state['league_season_moments'], group_moments(closed(weekly_df), ['season'], WEEK_MOMENT_COLS),
+        ['season'], WEEK_MOMENT_COLS)
+
+    for name, rows in [('features_overall', features_df), ('features_overall_weekly', weekly_df)]:
+        frozen = [df for df in (state[name], closed(rows)) if df is not None]
+        new_state[name] = pd.concat(frozen, ignore_index=True)
+
+    for name in STANDINGS_TABLES:
+        new_state[name] = (standings or {}).get(name, state.get(name))
+    return new_state
+
+
+def compare_outputs(full_df, incremental_df, name, rtol=1e-9):
+    '''
+    Equivalence check between a full rebuild and an incremental build of the same table.
+    Row order is not part of the contract, so both sides are sorted on every column first.
+    Returns True when they match; prints the first difference otherwise.
+    '''
+    if sorted(full_df.columns) != sorted(incremental_df.columns):
+        print(f"{name}: column mismatch {set(full_df.columns) ^ set(incremental_df.columns)}")
+        return False
+
+    cols = list(full_df.columns)
+    a = full_df[cols].sort_values(cols).reset_index(drop=True)
+    b = incremental_df[cols].sort_values(cols).reset_index(drop=True)
+    try:
+        pd.testing.assert_frame_equal(a, b, check_dtype=False, check_exact=False, rtol=rtol)
+    except AssertionError as e:
+        print(f"{name}: incremental build differs from full rebuild\n{e}")
+        return False
+    print(f"{name}: incremental build matches full rebuild ({len(a)} rows)")
+    return True
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import requests
+from google.cloud import storage
+
+# Columnar store for the weekly feature tables.
+#
+# Each table (features_overall_weekly, features_overall_weekly_deji, ...) is written as Parquet partitioned by
+# season and conference:
+#   feature_store/<table>/season=2024/conference=East/part-0.parquet
+#   feature_store/<table>/manifest.json
+# Rows within a partition are sorted by week, the column read_features() filters on, so the row group statistics
+# let a week filter skip every row group of the other weeks. The sort is stable: rows of a week keep their table
+# order, so reading a table back gives the same rows in the same order within every (season, week, conference).
+# The manifest lists the columns (in table order) and every partition with its row count, week range and md5.
+#
+# Readers use read_features() / week_features() / player_features(). With remote=True they fetch the manifest
+# from the public bucket and download only the partitions the query touches (and only when their md5 changed
+# since the last download), instead of the whole table as CSV. The modeling code reads the published copy with its
+# own reader (modeling/store_reader.py), so a change to the layout or the manifest has to be made there too.
+
+STORE_DIR = 'feature_store'
+STORE_VERSION = 2
+PARTITION_COLS = ['season', 'conference']
+SORT_COLS = ['week']
+ROW_GROUP_SIZE = 1024
+GCS_PREFIX = 'nba_data/feature_store/'
+PUBLIC_URL = 'https://storage.googleapis.com/nba_award_predictor/'
+CREDENTIALS_PATH = 'cis-5450-final-project-485661e2f371.json'
+BUCKET_NAME = 'nba_award_predictor'
+PARTITIONING = ds.partitioning(pa.schema([('season', pa.int64()), ('conference', pa.string())]), flavor='hive')
+
+
+def _md5(path):
+    h = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def partition_path(season, conference):
+    return f'season={int(season)}/conference={conference}/part-0.parquet'
+
+
+def write_table(df, table, store_dir=STORE_DIR):
+    '''
+    Replace a table in the local store with df.
+    df = a weekly feature table, e.g. features_overall_weekly
+    table = name of the table in the store, e.g. "features_overall_weekly"
+    Returns the manifest.
+    '''
+    table_dir = os.path.join(store_dir, table)
+    if os.path.exists(table_dir):
+        shutil.rmtree(table_dir)
+    os.makedirs(table_dir)
+
+    columns = list(df.columns)
+    value_cols = [c for c in columns if c not in PARTITION_COLS]
+    partitions = []
+    for (season, conference), part in df.groupby(PARTITION_COLS, sort=True, observed=True):
+        part = part.sort_values(SORT_COLS, kind='mergesort')[value_cols]
+        path = partition_path(season, conference)
+        full_path = os.path.join(table_dir, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(part, preserve_index=False), full_path, row_group_size=ROW_GROUP_SIZE)
+        partitions.append({
+            'season': int(season),
+            'conference': str(conference),
+            'path': path,
+            'rows': len(part),
+            'first_week_start': str(pd.Timestamp(part['week_start'].min()).date()),
+            'last_week_start': str(pd.Timestamp(part['week_start'].max()).date()),
+            'md5': _md5(full_path),
+        })
+
+    manifest = {
+        'version': STORE_VERSION,
+        'table': table,
+        'rows': len(df),
+        'columns': columns,
+        'dtypes': {c: str(df[c].dtype) for c in columns},
+        'partition_cols': PARTITION_COLS,
+        'sort_cols': SORT_COLS,
+        'partitions': partitions,
+    }
+    with open(os.path.join(table_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def load_manifest(table, store_dir=STORE_DIR):
+    path = os.path.join(store_dir, table, 'manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def fetch_manifest(table):
+    '''Manifest of the published copy of a table, or None when it cannot be fetched.'''
+    try:
+        response = requests.get(f'{PUBLIC_URL}{GCS_PREFIX}{table}/manifest.json', timeout=30)
+        response.raise_for_status()
+        return response.json()
+    except Exception:
+        return None
+
+
+def upload_table(table, store_dir=STORE_DIR):
+    '''
+    Upload a table of the local store to GCS. Partitions whose md5 matches the published manifest are skipped,
+    so a run that only changed the current season uploads one season's files. The manifest goes last.
+    '''
+    manifest = load_manifest(table, store_dir)
+    published = fetch_manifest(table) or {'partitions': []}
+    published_md5 = {p['path']: p['md5'] for p in published['partitions']}
+    try:
+        storage_client = storage.Client.from_service_account_json(CREDENTIALS_PATH)
+        bucket = storage_client.bucket(BUCKET_NAME)
+        uploaded = 0
+        for p in manifest['partitions']:
+            if published_md5.get(p['path']) == p['md5']:
+                continue
+            blob = bucket.blob(f"{GCS_PREFIX}{table}/{p['path']}")
+            blob.cache_control = "max-age=0"
+            blob.upload_from_filename(os.path.join(store_dir, table, p['path']))
+            uploaded += 1
+        # Partitions that no longer exist (e.g. a season that was rebuilt away)
+        current = {p['path'] for p in manifest['partitions']}
+        for path in published_md5:
+            if path not in current:
+                bucket.blob(f"{GCS_PREFIX}{table}/{path}").delete()
+        blob = bucket.blob(f"{GCS_PREFIX}{table}/manifest.json")
+        blob.cache_control = "max-age=0"
+        blob.upload_from_filename(os.path.join(store_dir, table, 'manifest.json'))
+        print(f"Feature store {table}: uploaded {uploaded} of {len(manifest['partitions'])} partitions")
+    except:
+        print(f"Feature store {table} saved locally but not uploaded to GCS (Hint: check for json credentials file)")
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def _sync(table, manifest, partitions, store_dir):
+    '''Download the given partitions of the published table that are missing locally or out of date.'''
+    local = load_manifest(table, store_dir) or {'partitions': []}
+    local_md5 = {p['path']: p['md5'] for p in local['partitions']}
+    for p in partitions:
+        full_path = os.path.join(store_dir, table, p['path'])
+        if local_md5.get(p['path']) == p['md5'] and os.path.exists(full_path):
+            continue
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        response = requests.get(f"{PUBLIC_URL}{GCS_PREFIX}{table}/{p['path']}", timeout=300)
+        response.raise_for_status()
+        with open(full_path, 'wb') as f:
+            f.write(response.content)
+    # Record what is on disk now: the published partitions we hold, plus local ones not touched by this sync
+    synced = {p['path'] for p in partitions}
+    held = [p for p in manifest['partitions']
+            if p['path'] in synced or (local_md5.get(p['path']) == p['md5'])]
+    with open(os.path.join(store_dir, table, 'manifest.json'), 'w') as f:
+        json.dump({**manifest, 'partitions': held}, f, indent=1)
+
+
+def read_features(table='features_overall_weekly', season=None, conference=None, week=None, player_id=None,
+                  columns=None, filter=None, store_dir=STORE_DIR, remote=True):
+    '''
+    Read a slice of a weekly feature table.
+
+    season, conference = one value or a list; only the matching partitions are opened (and downloaded)
+    week, player_id = one value or a list; pushed down to the Parquet reader as a row filter
+    columns = list of columns to read, default every column. Partition columns can be included.
+    filter = extra pyarrow.dataset expression, e.g. ds.field('games_played_this_week') >= 2
+    remote = fetch the published manifest and download the partitions that are missing or stale first.
+             False reads the local store as it is.
+    Returns a pandas dataframe with the columns in table order.
+    '''
+    manifest = fetch_manifest(table) if remote else None
+    if manifest is None:
+        manifest = load_manifest(table, store_dir)
+        remote = False
+    if manifest is None:
+        raise FileNotFoundError(f"No feature store table {table} in {store_dir} or in gs://{BUCKET_NAME}/{GCS_PREFIX}")
+
+    seasons, conferences = _as_list(season), _as_list(conference)
+    partitions = [p for p in manifest['partitions']
+                  if (seasons is None or p['season'] in seasons)
+                  and (conferences is None or p['conference'] in conferences)]
+    if remote:
+        _sync(table, manifest, partitions, store_dir)
+
+    out_cols = [c for c in manifest['columns'] if columns is None or c in columns]
+    if not partitions:
+        return pd.DataFrame(columns=out_cols)
+
+    expr = None
+    for col, values in [('week', _as_list(week)), ('player_id', _as_list(player_id))]:
+        if values is not None:
+            cond = ds.field(col).isin(values)
+            expr = cond if expr is None else expr & cond
+    if filter is not None:
+        expr = filter if expr is None else expr & filter
+
+    table_dir = os.path.join(store_dir, table)
+    dataset = ds.dataset([os.path.join(table_dir, p['path']) for p in partitions], format='parquet',
+                         partitioning=PARTITIONING, partition_base_dir=table_dir)
+    return dataset.to_table(columns=out_cols, filter=expr).to_pandas()[out_cols]
+
+
+def week_features(season, week, conference, table='features_overall_weekly', columns=None, **kwargs):
+    '''Rows of one Player of the Week race: every player of a conference in a week.'''
+    return read_features(table, season=season, conference=conference, week=week, columns=columns, **kwargs)
+
+
+def player_features(player_id, season=None, table='features_overall_weekly', columns=None, **kwargs):
+    '''Every week of one or more players, optionally limited to some seasons.'''
+    return read_features(table, season=season, player_id=player_id, columns=columns, **kwargs)
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+
+def shifted_expanding_moments(df, group_cols, value_cols, mean_suffix='_mean_season', std_suffix='_std_season', stable=True, prior=None):
+    '''
+    Vectorized replacement for
+        df.groupby(group_cols).apply(lambda g: g[col].expanding().mean().shift(1))
+        df.groupby(group_cols).apply(lambda g: g[col].expanding().std(ddof=0).shift(1))
+    for every column in value_cols at once.
+
+    Each row gets the mean and population std of all *earlier* rows in its group, taken in the
+    current row order of df (sort df before calling). The first row of every group gets NaN.
+
+    The moments come from grouped cumulative sums and sums of squares, so there is no Python call
+    per group. With stable=True every value is first shifted by its group's first value before
+    squaring, which keeps the sums small and avoids catastrophic cancellation in sum(x^2) - n*mean^2.
+
+    df = A pandas dataframe, sorted so rows within each group are in time order
+    group_cols = list of columns identifying a group, e.g. ["player_id", "season"]
+    value_cols = list of numeric columns to compute moments for
+    prior = optional running state from group_moments() for rows that came before df. Groups found
+            in prior continue from those counts and sums instead of starting empty.
+    Returns df with {col}{mean_suffix} and {col}{std_suffix} columns added.
+    '''
+    df = df.copy()
+    keys = [df[c] for c in group_cols]
+    values = df[value_cols].astype(float)
+    g = values.groupby(keys, sort=False)
+
+    # Number of earlier rows in the group (NaN for rows with a null key)
+    n_prior = g.cumcount().to_numpy(dtype=float, copy=True)[:, None]
+
+    if stable:
+        offset = g.transform('first')
+    else:
+        offset = pd.DataFrame(0.0, index=values.index, columns=value_cols)
+
+    prior_sum = 0.0
+    prior_sq = 0.0
+    if prior is not None:
+        p = df[group_cols].merge(prior, on=group_cols, how='left')
+        has_prior = p['n'].notna().to_numpy()
+        n_prior = n_prior + p['n'].fillna(0).to_numpy()[:, None]
+        # Continue with the offset the state was accumulated under
+        prior_offset = p[[f"{c}_offset" for c in value_cols]].to_numpy()
+        offset = pd.DataFrame(
+            np.where(has_prior[:, None], prior_offset, offset.to_numpy()),
+            index=values.index, columns=value_cols,
+        )
+        prior_sum = p[[f"{c}_sum" for c in value_cols]].fillna(0).to_numpy()
+        prior_sq = p[[f"{c}_sumsq" for c in value_cols]].fillna(0).to_numpy()
+
+    shifted = values - offset
+
+    # Cumulative sums excluding the current row
+    sum_prior = (shifted.groupby(keys, sort=False).cumsum() - shifted).to_numpy() + prior_sum
+    sq_prior = ((shifted ** 2).groupby(keys, sort=False).cumsum() - shifted ** 2).to_numpy() + prior_sq
+
+    # The first row of a group has nothing before it
+    n_prior[n_prior == 0] = np.nan
+
+    mean_shifted = sum_prior / n_prior
+    var = sq_prior / n_prior - mean_shifted ** 2
+    # Rounding can leave tiny negative variances; expanding().std() reports these as 0
+    var = np.clip(var, 0.0, None)
+
+    mean = mean_shifted + offset.to_numpy()
+    std = np.sqrt(var)
+
+    for i, col in enumerate(value_cols):
+        df[f"{col}{mean_suffix}"] = mean[:, i]
+        df[f"{col}{std_suffix}"] = std[:, i]
+
+    return df
+
+
+def group_moments(df, group_cols, value_cols):
+    '''
+    Running state for each group: row count n, plus {col}_offset, {col}_sum and {col}_sumsq, the
+    sums of (value - offset) and (value - offset)^2. The offset is the group's first value, which
+    keeps the sums small. Feed the result to shifted_expanding_moments(prior=...) or merge it
+    with newer state through combine_moments().
+    '''
+    keys = [df[c] for c in group_cols]
+    values = df[value_cols].astype(float)
+    g = values.groupby(keys, sort=False)
+    shifted = values - g.transform('first')
+
+    out = pd.concat([
+        g.size().rename('n'),
+        g.first().add_suffix('_offset'),
+        shifted.groupby(keys, sort=False).sum().add_suffix('_sum'),
+        (shifted ** 2).groupby(keys, sort=False).sum().add_suffix('_sumsq'),
+    ], axis=1)
+    out.index.names = group_cols
+    return out.reset_index()
+
+
+def combine_moments(old, new, group_cols, value_cols):
+    '''
+    Merge two group_moments() states, e.g. the persisted state and the moments of newly closed
+    rows. Groups present in both keep the old offset; the new sums are re-centred onto it.
+    '''
+    if old is None or len(old) == 0:
+        return new.copy()
+    if new is None or len(new) == 0:
+        return old.copy()
+
+    m = old.merge(new, on=group_cols, how='outer', suffixes=('_old', '_new'))
+    out = m[group_cols].copy()
+    n_old = m['n_old'].fillna(0)
+    n_new = m['n_new'].fillna(0)
+    out['n'] = (n_old + n_new).astype(int)
+
+    for c in value_cols:
+        k_old = m[f"{c}_offset_old"]
+        k_new = m[f"{c}_offset_new"]
+        offset = k_old.fillna(k_new)
+        d = (k_new - offset).fillna(0)
+        s_new = m[f"{c}_sum_new"].fillna(0)
+        q_new = m[f"{c}_sumsq_new"].fillna(0)
+
+        out[f"{c}_offset"] = offset
+        out[f"{c}_sum"] = m[f"{c}_sum_old"].fillna(0) + s_new + n_new * d
+        out[f"{c}_sumsq"] = m[f"{c}_sumsq_old"].fillna(0) + q_new + 2 * d * s_new + n_new * d ** 2
+
+    return out
+
+
+def moments_mean_std(state, value_cols, ddof=0, mean_suffix='_mean', std_suffix='_std'):
+    '''
+    Turn a group_moments() state into {col}{mean_suffix} and {col}{std_suffix} columns.
+    ddof=1 matches pandas .std(); groups with n <= ddof get a NaN std, like pandas.
+    '''
+    out = state.copy()
+    n = out['n'].astype(float)
+    for c in value_cols:
+        s = out[f"{c}_sum"]
+        q = out[f"{c}_sumsq"]
+        out[f"{c}{mean_suffix}"] = out[f"{c}_offset"] + s / n
+        var = ((q - s ** 2 / n) / (n - ddof)).where(n > ddof)
+        out[f"{c}{std_suffix}"] = np.sqrt(var.clip(lower=0))
+    return out
+
+
+def normalize_by_lagged_group(df, group_col, value_cols, moments, lag=1, ddof=1, stat_names=None, z_names=None, fill_value=0.0):
+    '''
+    z-score value columns against the statistics of an earlier group, e.g. each week's points against the
+    league-wide mean and std of the previous season:
+        z = (value - mean of group (key - lag)) / std of group (key - lag)
+
+    The group statistics come from a group_moments() state computed once, and are broadcast onto the rows by
+    position (Index.get_indexer on the lagged key) rather than by merging a copy of the table. Every column in
+    value_cols is handled in the same pass.
+
+    df = A pandas dataframe with an integer group_col, e.g. "season". Columns are added to it in place.
+    group_col = the partition column; the statistics of key - lag are used for each row
+    value_cols = list of numeric columns to normalize
+    moments = group_moments(..., [group_col], value_cols) covering the lagged groups, e.g. combined with the
+              persisted state through combine_moments()
+    ddof = degrees of freedom of the std, 1 matches pandas .std()
+    stat_names = optional {col: (mean column, std column)} to also add the lagged statistics to df
+    z_names = {col: z column}, default {col}_z
+    fill_value = z for rows without a lagged group (or with a NaN z), e.g. the first season
+    Returns df.
+    '''
+    stats = moments_mean_std(moments, value_cols, ddof=ddof)
+    pos = pd.Index(stats[group_col]).get_indexer(df[group_col].to_numpy() - lag)
+    # Rows without a lagged group point one past the end, where each statistic gets a NaN appended
+    pos = np.where(pos >= 0, pos, len(stats))
+
+    z_names = z_names or {col: f"{col}_z" for col in value_cols}
+    z_cols = {}
+    for col in value_cols:
+        mean = np.append(stats[f"{col}_mean"].to_numpy(dtype=float), np.nan)[pos]
+        std = np.append(stats[f"{col}_std"].to_numpy(dtype=float), np.nan)[pos]
+        if stat_names is not None:
+            df[stat_names[col][0]] = mean
+            df[stat_names[col][1]] = std
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = (df[col].to_numpy(dtype=float) - mean) / std
+        z_cols[z_names[col]] = np.where(np.isnan(z), fill_value, z)
+    for name, z in z_cols.items():
+        df[name] = z
+    return df
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+
+import duckdb
+import pandas as pd
+import psutil
+
+# Memory budget for the feature build.
+#
+# The budget is split between DuckDB and pandas. DuckDB gets DUCKDB_SHARE of it as its memory_limit and spills
+# joins and aggregations that would go over it to spill_dir. Pandas frames cannot spill on their own, so
+# frames that are kept around for a later step go through park(): once the process is over the budget they
+# are written to parquet in spill_dir and only read back when that step needs them.
+# Every step marked with start() gets its RSS before/after and peak recorded for report().
+
+DUCKDB_SHARE = 0.5
+SAMPLE_SECONDS = 0.05
+SPILL_DIR = 'spill'
+
+
+def parse_size(size):
+    '''"512MB", "2GB" or a plain number of bytes -> bytes'''
+    size = str(size).strip().upper()
+    for unit, factor in [('GB', 1024 ** 3), ('MB', 1024 ** 2), ('KB', 1024)]:
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)]) * factor)
+    return int(size)
+
+
+def container_memory():
+    '''
+    Memory available to this container: the cgroup limit when there is one (Cloud Run, Docker),
+    otherwise the machine's total memory.
+    '''
+    for path in ['/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes']:
+        try:
+            with open(path) as f:
+                limit = f.read().strip()
+        except OSError:
+            continue
+        # cgroup v2 reports "max", v1 a huge number, when there is no limit
+        if limit.isdigit() and int(limit) < psutil.virtual_memory().total:
+            return int(limit)
+    return psutil.virtual_memory().total
+
+
+class ParkedFrame:
+    '''A dataframe held by MemoryBudget.park(), either in memory or spilled to a parquet file.'''
+
+    def __init__(self, df=None, path=None):
+        self.df = df
+        self.path = path
+
+    def get(self):
+        if self.df is not None:
+            return self.df
+        return pd.read_parquet(self.path)
+
+    def release(self):
+        self.df = None
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class MemoryBudget:
+    '''
+    budget = bytes the build may use, e.g. parse_size("2GB"). None means 75% of container_memory().
+    spill_dir = local directory for DuckDB temp files and parked frames
+    '''
+
+    def __init__(self, budget=None, spill_dir=SPILL_DIR):
+        self.budget = budget if budget is not None else int(0.75 * container_memory())
+        self.spill_dir = spill_dir
+        self.process = psutil.Process()
+        self.steps = []
+        self._current = None
+        self._parked = 0
+
+        os.makedirs(spill_dir, exist_ok=True)
+        duckdb.execute(f"SET memory_limit='{int(self.budget * DUCKDB_SHARE) // 1024 ** 2}MB'")
+        duckdb.execute(f"SET temp_directory='{spill_dir}'")
+
+        sampler = threading.Thread(target=self._sample, daemon=True)
+        sampler.start()
+
+    def rss(self):
+        return self.process.memory_info().rss
+
+    def _sample(self):
+        while True:
+            step = self._current
+            if step is not None:
+                step['peak'] = max(step['peak'], self.rss())
+            time.sleep(SAMPLE_SECONDS)
+
+    def start(self, name):
+        '''
+        End the current step and start recording a new one: RSS before/after and the peak RSS until the
+        next start() or finish(). Steps are sequential, so a linear script only needs one call per step.
+        '''
+        self.finish()
+        rss = self.rss()
+        self._current = {'step': name, 'before': rss, 'after': None, 'peak': rss, 'started': time.time(), 'seconds': None}
+        self.steps.append(self._current)
+
+    def finish(self):
+        step = self._current
+        if step is None:
+            return
+        self._current = None
+        step['after'] = self.rss()
+        step['peak'] = max(step['peak'], step['after'])
+        step['seconds'] = time.time() - step['started']
+
+    def over_budget(self):
+        return self.rss() > self.budget
+
+    def park(self, df, name):
+        '''
+        Hold a dataframe until a later step. Spills it to parquet when the process is over the budget.
+        Returns a ParkedFrame; call .get() to use it and .release() once done with it.
+        '''
+        if not self.over_budget():
+            return ParkedFrame(df=df)
+        self._parked += 1
+        path = os.path.join(self.spill_dir, f'{self._parked}_{name}.parquet')
+        df.to_parquet(path, index=False)
+        print(f"Memory over budget, spilled {name} ({len(df)} rows) to {path}")
+        return ParkedFrame(path=path)
+
+    def report(self):
+        self.finish()
+        mb = 1024 ** 2
+        print(f"Memory budget: {self.budget / mb:.0f} MB (DuckDB limit {self.budget * DUCKDB_SHARE / mb:.0f} MB, spill dir {self.spill_dir})")
+        print(f"{'step':<40}{'rss before':>12}{'rss after':>12}{'peak':>12}{'seconds':>10}")
+        for s in self.steps:
+            flag = '  over budget' if s['peak'] > self.budget else ''
+            print(f"{s['step']:<40}{s['before'] / mb:>10.0f}MB{s['after'] / mb:>10.0f}MB{s['peak'] / mb:>10.0f}MB{s['seconds']:>10.1f}{flag}")
+
+
+class NoBudget:
+    '''Stands in for MemoryBudget when a build function is called without one: nothing is tracked or spilled.'''
+
+    def start(self, name):
+        pass
+
+    def finish(self):
+        pass
+
+    def park(self, df, name):
+        return ParkedFrame(df=df)
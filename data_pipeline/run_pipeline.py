@@ -10,10 +10,7 @@ scripts = [
     'player_of_the_week_script.py',
     'player_statistics_script.py',
     'play_by_play.py',
-    'overall_features.py',
-    'overall_features_deji.py',
-    'for_inference.py',
-    'for_inference_deji.py'
+    'feature_engine.py'
 ]
 
 def run_script(script_name):
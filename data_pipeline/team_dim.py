@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Team dimension for the feature build.
+#
+# Team names are only compared as strings once: team_dictionary() collects every name in the inputs and
+# team_key() turns a name column into a small integer key (position in the sorted dictionary + 1). The feature
+# joins and group-bys run on those keys, and names stay around as dictionary-encoded categoricals (team_dtype())
+# for the output columns. Sorting by key gives the same order as sorting by name.
+
+CONFERENCE_CODES = {'East': 1, 'West': 2}
+CONFERENCE_DTYPE = pd.CategoricalDtype(list(CONFERENCE_CODES))
+
+
+team_info = {
+    # Eastern Conference
+    'Boston Celtics': {'conference': 'East', 'team_nickname': 'Celtics'},
+    'Brooklyn Nets': {'conference': 'East', 'team_nickname': 'Nets'},
+    'New York Knicks': {'conference': 'East', 'team_nickname': 'Knicks'},
+    'Philadelphia 76ers': {'conference': 'East', 'team_nickname': '76ers'},
+    'Philadelphia Sixers': {'conference': 'East', 'team_nickname': 'Sixers'},
+    'Toronto Raptors': {'conference': 'East', 'team_nickname': 'Raptors'},
+    'Chicago Bulls': {'conference': 'East', 'team_nickname': 'Bulls'},
+    'Cleveland Cavaliers': {'conference': 'East', 'team_nickname': 'Cavaliers'},
+    'Detroit Pistons': {'conference': 'East', 'team_nickname': 'Pistons'},
+    'Indiana Pacers': {'conference': 'East', 'team_nickname': 'Pacers'},
+    'Milwaukee Bucks': {'conference': 'East', 'team_nickname': 'Bucks'},
+    'Atlanta Hawks': {'conference': 'East', 'team_nickname': 'Hawks'},
+    'Charlotte Hornets': {'conference': 'East', 'team_nickname': 'Hornets'},
+    'Miami Heat': {'conference': 'East', 'team_nickname': 'Heat'},
+    'Orlando Magic': {'conference': 'East', 'team_nickname': 'Magic'},
+    'Washington Wizards': {'conference': 'East', 'team_nickname': 'Wizards'},
+    'Washington Bullets': {'conference': 'East', 'team_nickname': 'Bullets'},
+    'New Jersey Nets': {'conference': 'East', 'team_nickname': 'Nets'},
+    'Charlotte Bobcats': {'conference': 'East', 'team_nickname': 'Bobcats'},
+
+    # Western Conference
+    'Denver Nuggets': {'conference': 'West', 'team_nickname': 'Nuggets'},
+    'Minnesota Timberwolves': {'conference': 'West', 'team_nickname': 'Timberwolves'},
+    'Oklahoma City Thunder': {'conference': 'West', 'team_nickname': 'Thunder'},
+    'Portland Trail Blazers': {'conference': 'West', 'team_nickname': 'Trail Blazers'},
+    'Utah Jazz': {'conference': 'West', 'team_nickname': 'Jazz'},
+    'Golden State Warriors': {'conference': 'West', 'team_nickname': 'Warriors'},
+    'Los Angeles Clippers': {'conference': 'West', 'team_nickname': 'Clippers'},
+    'LA Clippers': {'conference': 'West', 'team_nickname': 'Clippers'},
+    'Los Angeles Lakers': {'conference': 'West', 'team_nickname': 'Lakers'},
+    'Phoenix Suns': {'conference': 'West', 'team_nickname': 'Suns'},
+    'Sacramento Kings': {'conference': 'West', 'team_nickname': 'Kings'},
+    'Dallas Mavericks': {'conference': 'West', 'team_nickname': 'Mavericks'},
+    'Houston Rockets': {'conference': 'West', 'team_nickname': 'Rockets'},
+    'Memphis Grizzlies': {'conference': 'West', 'team_nickname': 'Grizzlies'},
+    'New Orleans Pelicans': {'conference': 'West', 'team_nickname': 'Pelicans'},
+    'San Antonio Spurs': {'conference': 'West', 'team_nickname': 'Spurs'},
+    'Seattle SuperSonics': {'conference': 'West', 'team_nickname': 'SuperSonics'},
+    'San Diego Clippers': {'conference': 'West', 'team_nickname': 'Clippers'},
+    'Kansas City Kings': {'conference': 'West', 'team_nickname': 'Kings'},
+    'New Orleans Hornets': {'conference': 'West', 'team_nickname': 'Hornets'},
+    'Vancouver Grizzlies': {'conference': 'West', 'team_nickname': 'Grizzlies'},
+    'Oklahoma City Hornets': {'conference': 'West', 'team_nickname': 'Hornets'},
+    'New Orleans Jazz': {'conference': 'West', 'team_nickname': 'Jazz'}
+}
+
+team_conference_df = pd.DataFrame.from_dict(team_info, orient='index')
+team_conference_df.index.name = 'team'
+team_conference_df = team_conference_df.reset_index()
+team_conference_df['conference_key'] = team_conference_df['conference'].map(CONFERENCE_CODES)
+
+
+def team_dictionary(*name_columns):
+    '''Sorted distinct team names found in any of the given columns, missing names left out.'''
+    names = np.concatenate([pd.Series(c).dropna().unique() for c in name_columns] + [team_conference_df['team_nickname'].unique()])
+    return pd.Index(sorted(set(names)))
+
+
+def team_key(names, dictionary):
+    '''
+    names = series of team names
+    dictionary = team_dictionary() covering those names
+    Returns the nullable Int16 key of each name; missing names (and names not in the dictionary) get NA so they never join.
+    '''
+    codes = dictionary.get_indexer(names)
+    return pd.Series(pd.array(np.where(codes >= 0, codes + 1, 0), dtype='Int16'), index=names.index).mask(codes < 0)
+
+
+def team_dtype(dictionary):
+    '''Categorical dtype for team name columns, sharing its categories (and so its codes) with team_key().'''
+    return pd.CategoricalDtype(dictionary)
+
+
+def conference_key(conferences):
+    '''Small integer key for a conference name column, see CONFERENCE_CODES.'''
+    return conferences.map(CONFERENCE_CODES).astype('Int8')
+
+
+def team_conference(cities, nicknames):
+    '''
+    Conference of each team from its city and nickname columns, looked up by full name in team_info, so a
+    nickname that moved conferences (Hornets) gets the conference of the team that played. Full names missing
+    from team_info fall back to the nickname when it only ever belonged to one conference; otherwise NA.
+    '''
+    by_name = team_conference_df.set_index('team')['conference']
+    by_nickname = (team_conference_df[['team_nickname', 'conference']].drop_duplicates()
+                   .drop_duplicates('team_nickname', keep=False).set_index('team_nickname')['conference'])
+    conference = (cities + ' ' + nicknames).map(by_name)
+    return conference.fillna(nicknames.map(by_nickname))
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# Team standings engine, shared by the team records in feature_engine.build_team_games() and the intra-week
+# win pct features in feature_engine.build_win_pct_weekly().
+#
+# Input is one row per team per game (an "event") with an is_win flag and, for home/away splits, a home flag.
+# running_standings() gives every event the team's record *before* that game within its group (team + season,
+# or team + season + week) from grouped cumulative sums, with no Python call per group.
+# update_standings() keeps the result as running state between runs: only the groups that received a new game,
+# or a game whose result changed since the last run, are recomputed; every other group's rows are reused as they
+# are. A group is always recomputed whole, so a game that sorts before games already in the state still ends up
+# in the right place.
+
+
+def _prior(flag, group_id):
+    '''Count of earlier flagged events in the group.'''
+    return flag.groupby(group_id, sort=False).cumsum() - flag
+
+
+def _streak_prior(flag, group_id):
+    '''Length of the run of flagged events ending at the previous event of the group.'''
+    prior = flag.groupby(group_id, sort=False).shift(fill_value=0)
+    # Every group starts with prior == 0, so a global run id never crosses a group boundary
+    run = (prior == 0).cumsum()
+    return prior.groupby(run, sort=False).cumsum()
+
+
+def running_standings(events, group_cols, order_cols, prefix='', home=True, streaks=True):
+    '''
+    Record before each event within its group.
+
+    events = A pandas dataframe with one row per team per game and an is_win column (plus home when home=True)
+    group_cols = columns identifying a standings group, e.g. ["teamid", "season"]
+    order_cols = columns giving the order of games within a group, e.g. ["gamedate", "gameid"]
+    prefix = prefix for the added columns, e.g. "week_" for records within a week
+    home = add the home/away splits
+    streaks = add the win streaks (overall, and home/away when home=True)
+    Returns events sorted by group_cols + order_cols with {prefix}games_prior, {prefix}wins_prior and
+    {prefix}losses_prior, plus home_*/away_* and *_win_streak_prior columns when asked for.
+    '''
+    df = events.sort_values(group_cols + order_cols, kind='mergesort').reset_index(drop=True)
+    group_id = df.groupby(group_cols, sort=False, dropna=False).ngroup()
+    win = df['is_win'].astype(int)
+
+    df[f'{prefix}games_prior'] = win.groupby(group_id, sort=False).cumcount()
+    df[f'{prefix}wins_prior'] = _prior(win, group_id)
+    df[f'{prefix}losses_prior'] = df[f'{prefix}games_prior'] - df[f'{prefix}wins_prior']
+    if streaks:
+        df[f'{prefix}win_streak_prior'] = _streak_prior(win, group_id)
+
+    if home:
+        is_home = df['home'].astype(int)
+        home_win = is_home * win
+        away_win = (1 - is_home) * win
+        df[f'{prefix}home_games_prior'] = _prior(is_home, group_id)
+        df[f'{prefix}away_games_prior'] = df[f'{prefix}games_prior'] - df[f'{prefix}home_games_prior']
+        df[f'{prefix}home_wins_prior'] = _prior(home_win, group_id)
+        df[f'{prefix}away_wins_prior'] = _prior(away_win, group_id)
+        df[f'{prefix}home_losses_prior'] = df[f'{prefix}home_games_prior'] - df[f'{prefix}home_wins_prior']
+        df[f'{prefix}away_losses_prior'] = df[f'{prefix}away_games_prior'] - df[f'{prefix}away_wins_prior']
+        if streaks:
+            df[f'{prefix}home_win_streak_prior'] = _streak_prior(home_win, group_id)
+            df[f'{prefix}away_win_streak_prior'] = _streak_prior(away_win, group_id)
+
+    return df
+
+
+def update_standings(previous, events, key_cols, group_cols, compute):
+    '''
+    Bring persisted standings up to date with this run's events.
+
+    previous = standings returned by an earlier call (or None for a full build)
+    events = every event known this run, same columns as the events previous was computed from
+    key_cols = columns identifying an event, e.g. ["gameid", "teamid"]
+    group_cols = the outermost standings group, e.g. ["teamid", "season"]; groups with a new event are recomputed.
+                 compute may also work on finer groups (e.g. weeks) as long as they nest inside these.
+    compute = function taking events and returning their standings, e.g. a running_standings() call
+    Returns the standings of every event in previous and events. An event whose key is in previous but whose
+    other columns changed (e.g. a corrected result) replaces the old one, and both its old and new groups are
+    recomputed. Events of previous that are missing from events are kept.
+    '''
+    if previous is None or len(previous) == 0:
+        return compute(events)
+
+    value_cols = [c for c in events.columns if c not in key_cols]
+    merged = events.merge(previous[list(events.columns)], on=key_cols, how='left', suffixes=('', '_old'),
+                          indicator=True)
+    unseen = (merged['_merge'] == 'left_only').to_numpy()
+    changed = np.zeros(len(merged), dtype=bool)
+    for c in value_cols:
+        current, old = merged[c], merged[f'{c}_old']
+        changed |= ((current != old) & ~(current.isna() & old.isna())).to_numpy()
+    changed &= ~unseen
+    if not (unseen | changed).any():
+        return previous
+
+    new = merged.loc[unseen | changed, list(events.columns)]
+    old_groups = merged.loc[changed, [f'{c}_old' if c in value_cols else c for c in group_cols]]
+    old_groups.columns = group_cols
+    reopened = pd.concat([new[group_cols], old_groups], ignore_index=True).drop_duplicates().assign(_reopened=True)
+    flag = previous[group_cols].merge(reopened, on=group_cols, how='left')['_reopened'].notna().to_numpy()
+    replaced = merged.loc[changed, key_cols].assign(_replaced=True)
+    flag_replaced = previous[key_cols].merge(replaced, on=key_cols, how='left')['_replaced'].notna().to_numpy()
+    redo = pd.concat([previous.loc[flag & ~flag_replaced, list(events.columns)], new], ignore_index=True)
+    print(f"Standings: {unseen.sum()} new and {changed.sum()} changed events, recomputing {len(reopened)} groups")
+    return pd.concat([previous.loc[~flag], compute(redo)], ignore_index=True)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+
+import lightgbm as lgb
+import numpy as np
+
+from potw_ranker import CAT_COLS, DROP_COLS, GROUP_COLS, TARGET_COL, prepare_features, training_rows
+
+# LightGBM Player of the Week ranker from modeling/lightgbm_c.ipynb: data preparation and parameters shared by the
+# cross-validation runner, the hyperparameter search and the final model.
+#
+# Trees take team and conference as categorical features instead of one-hot columns. Rows are sorted by
+# (season, week, conference) so every group is contiguous, which is what LightGBM's lambdarank `group` sizes need
+# and what lets a season fold be a plain row range.
+
+RS = 42
+K = [1, 3, 5, 10]
+
+RANK_PARAMS = {
+    'objective': 'lambdarank',
+    'metric': 'ndcg',  # Normalized Discounted Cumulative Gain
+    'learning_rate': 0.05,
+    'num_leaves': 31,
+    'max_depth': -1,
+    'feature_fraction': 0.8,
+    'bagging_fraction': 0.8,
+    'bagging_freq': 5,
+    'min_child_samples': 20,
+    'verbose': -1,
+    'random_state': RS,
+    'n_jobs': -1,
+}  # lambdarank does not utilize scale_pos_weight because it optimizes within groups
+
+# Trees of the final model (the notebook's n_estimators). It trains without a validation set, so nothing stops it
+# early.
+FINAL_ROUNDS = 3000
+
+# How feature values are binned into histograms. Binning only depends on these and the rows it is built from, so
+# it is done once per matrix and training range, and every trial trains on subsets of those Datasets.
+# feature_pre_filter is off because it would tie the binned Dataset to the min_child_samples it was built with.
+DATASET_PARAMS = {'max_bin': 255, 'feature_pre_filter': False, 'verbose': -1}
+
+
+class RankingMatrix:
+    '''
+    The training rows as plain numpy arrays, sorted by group.
+
+    X = feature matrix; categorical columns hold their category codes (or are one-hot encoded, see ranking_matrix)
+    y = labels (won_player_of_the_week)
+    season = season of every row
+    group_offsets = CSR offsets: group g is rows group_offsets[g]:group_offsets[g + 1]
+    feature_names = column names of X
+    categorical_features = positions of the categorical columns in X
+    categories = {column: list of categories}, to encode inference rows the same way
+    cache_dir = directory of the .npy files when the arrays are memory-mapped from the matrix cache
+    '''
+
+    def __init__(self, X, y, season, group_offsets, feature_names, categorical_features, categories, cache_dir=None):
+        self.X = X
+        self.y = y
+        self.season = season
+        self.group_offsets = group_offsets
+        self.feature_names = feature_names
+        self.categorical_features = categorical_features
+        self.categories = categories
+        self.cache_dir = cache_dir
+
+    def group_sizes(self, start, stop):
+        '''Sizes of the groups in rows start:stop, which must fall on group boundaries.'''
+        offsets = self.group_offsets[(self.group_offsets >= start) & (self.group_offsets <= stop)]
+        return np.diff(offsets)
+
+    def group_ids(self):
+        return np.repeat(np.arange(len(self.group_offsets) - 1), np.diff(self.group_offsets))
+
+
+def ranking_matrix(df, training=True, one_hot=False, dtype=np.float64):
+    '''
+    RankingMatrix of a features-overall-weekly table.
+    training = keep only the final model's training seasons (2001-02 up to the season before inference)
+    one_hot = encode team and conference like the NN's inputs (prepare_features) instead of as category codes
+    dtype = dtype of X. LightGBM bins float32 values differently, so keep float64 for results that match the
+            notebook's DataFrame training; the NN casts to float32 anyway.
+    '''
+    rows = training_rows(df) if training else df
+    rows = rows.sort_values(GROUP_COLS, kind='mergesort')
+    categories = {}
+    if one_hot:
+        X = prepare_features(rows)
+    else:
+        X = rows.drop(columns=[c for c in DROP_COLS if c in rows.columns])
+        for c in CAT_COLS:
+            X[c] = X[c].astype('category')
+            categories[c] = list(X[c].cat.categories)
+            X[c] = X[c].cat.codes
+    keys = rows[GROUP_COLS].to_numpy()
+    new_group = np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)] if len(rows) else np.zeros(0, dtype=bool)
+    return RankingMatrix(
+        X=np.ascontiguousarray(X.to_numpy(dtype=dtype)),
+        y=rows[TARGET_COL].to_numpy(dtype=np.float64),
+        season=rows['season'].to_numpy(),
+        group_offsets=np.r_[np.flatnonzero(new_group), len(rows)],
+        feature_names=list(X.columns),
+        categorical_features=[] if one_hot else [list(X.columns).index(c) for c in CAT_COLS],
+        categories=categories,
+    )
+
+
+def binned_dataset(matrix, params=DATASET_PARAMS, bin_stop=None):
+    '''
+    lgb.Dataset of every row of a RankingMatrix (labels, groups, categorical features), binned.
+    bin_stop = build the bin boundaries from rows [0, bin_stop) only, e.g. a fold's training rows, so the rows
+               after it (the fold's validation season) are binned the way LightGBM bins a validation set that
+               references its training set. Default all rows, e.g. for the final model.
+    '''
+    X, y = np.asarray(matrix.X), np.asarray(matrix.y)
+    reference = None
+    if bin_stop is not None:
+        reference = lgb.Dataset(X[:bin_stop], label=y[:bin_stop], group=matrix.group_sizes(0, bin_stop),
+                                feature_name=matrix.feature_names, categorical_feature=matrix.categorical_features,
+                                params=params, free_raw_data=False).construct()
+    return lgb.Dataset(X, label=y, group=np.diff(matrix.group_offsets), feature_name=matrix.feature_names,
+                       categorical_feature=matrix.categorical_features, params=params, reference=reference,
+                       free_raw_data=False).construct()
+
+
+def binned_dataset_file(matrix, path=None, params=DATASET_PARAMS, bin_stop=None):
+    '''
+    Path of binned_dataset(matrix, params, bin_stop) saved in LightGBM's binary format, which loads without
+    binning again.
+    path = where to save it; default the matrix's cache directory, named by params and bin_stop. An existing file
+           is reused.
+    '''
+    if path is None:
+        if matrix.cache_dir is None:
+            raise ValueError("The matrix is not from the matrix cache; pass a path for the Dataset file")
+        key = hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        suffix = '' if bin_stop is None else f'_rows{bin_stop}'
+        path = os.path.join(matrix.cache_dir, f'lgb_dataset_{key}{suffix}.bin')
+    if not os.path.exists(path):
+        tmp = f'{path}.{os.getpid()}.tmp'
+        binned_dataset(matrix, params, bin_stop).save_binary(tmp)
+        os.replace(tmp, path)
+    return path
+
+
+def load_binned_dataset(path, params=DATASET_PARAMS):
+    return lgb.Dataset(path, params=params).construct()
+
+
+def row_subset(reference, start, stop):
+    '''
+    Dataset of rows start:stop of a binned Dataset, reusing its bins; start and stop must fall on group
+    boundaries, e.g. the row ranges of season_cv.season_folds().
+    '''
+    subset = reference.subset(np.arange(start, stop))
+    # A Dataset loaded from a binary file does not hand its groups to subsets, so set them from its boundaries
+    boundaries = reference.get_field('group')
+    if boundaries is not None:
+        subset.set_group(np.diff(boundaries[(boundaries >= start) & (boundaries <= stop)]))
+    return subset
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import requests
+
+from lgbm_ranker import RankingMatrix, ranking_matrix
+from potw_ranker import (CAT_COLS, DATA_URL, DROP_COLS, FIRST_TRAINING_SEASON, GROUP_COLS, INFERENCE_SEASON,
+                         TARGET_COL, get_csv_df)
+import store_reader
+
+# On-disk cache of training matrices, so modeling runs skip downloading and parsing the weekly feature CSV.
+#
+# A RankingMatrix is saved as one .npy file per array plus meta.json (feature names, categories, source) in a
+# directory named by a hash of the table, its version and the feature definition (DROP_COLS, CAT_COLS, the
+# encoding, dtype). A new upload of the table or a change to the feature lists gets a new directory; nothing
+# is ever updated in place.
+# Loading memory-maps the .npy files read-only, so it is instant and every process that loads the same matrix
+# (notebook, CV workers, Optuna trials) shares the same pages of the OS cache.
+#
+# Bucket tables are read from the partitioned Parquet feature store (store_reader.py) when they are published
+# there: only the partitions of the seasons the matrix uses are downloaded (training matrices skip the inference
+# season and the seasons before 2001), only the columns it uses are read, and partitions already in the local copy
+# of the store are not downloaded again. Tables that are not in the store are read as CSV.
+#
+# Table version: the md5s of the store partitions the matrix reads (from the store manifest, no download), so a
+# weekly run that only rewrites the inference season keeps training matrices cached. Otherwise the object
+# generation of a bucket CSV (a HEAD request), or the size and modification time of a local CSV.
+
+CACHE_DIR = '../matrix_cache'
+CACHE_FORMAT = 1
+STORE_VERSION_PREFIX = 'store-'
+ARRAYS = ['X', 'y', 'season', 'group_offsets']
+
+
+def store_table(table):
+    '''Feature store name of a bucket table, e.g. features-overall-weekly.csv -> features_overall_weekly'''
+    return os.path.splitext(os.path.basename(table))[0].replace('-', '_')
+
+
+def store_partitions(manifest, training=True):
+    '''Partitions of a feature store manifest a matrix reads: the training_rows() seasons when training.'''
+    return [p for p in manifest['partitions']
+            if not training or (p['season'] >= FIRST_TRAINING_SEASON and p['season'] != INFERENCE_SEASON)]
+
+
+def table_version(table, training=True):
+    '''
+    Version string of a local CSV or of a table in the bucket; None when the bucket cannot be reached.
+    Versions of feature store tables start with STORE_VERSION_PREFIX and only cover the partitions read.
+    '''
+    if os.path.exists(table):
+        stat = os.stat(table)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+    manifest = store_reader.fetch_manifest(store_table(table))
+    if manifest is not None:
+        md5s = sorted((p['path'], p['md5']) for p in store_partitions(manifest, training))
+        return STORE_VERSION_PREFIX + hashlib.sha1(json.dumps([manifest['columns'], md5s]).encode('utf-8')).hexdigest()
+    try:
+        r = requests.head(f"{DATA_URL}/{table}", timeout=10)
+        r.raise_for_status()
+    except requests.RequestException:
+        return None
+    return r.headers.get('x-goog-generation') or r.headers.get('ETag')
+
+
+def cache_key(table, version, training=True, one_hot=False, dtype=np.float32):
+    '''Directory name of a matrix: hash of the table, its version and everything that defines the features.'''
+    spec = {
+        'format': CACHE_FORMAT,
+        'table': os.path.basename(table),
+        'version': version,
+        'training': training,
+        'one_hot': one_hot,
+        'dtype': np.dtype(dtype).str,
+        'drop_cols': DROP_COLS,
+        'cat_cols': CAT_COLS,
+        'group_cols': GROUP_COLS,
+        'target_col': TARGET_COL,
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def save_matrix(matrix, path, meta=None):
+    '''
+    Write a RankingMatrix to directory path. The files are written to a temporary directory that is renamed
+    into place, so a concurrent reader sees either the whole matrix or none of it.
+    '''
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    try:
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, f'{name}.npy'), getattr(matrix, name))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({**(meta or {}), 'feature_names': matrix.feature_names,
+                       'categorical_features': matrix.categorical_features,
+                       'categories': matrix.categories}, f, default=str)
+        os.chmod(tmp, 0o755)  # mkdtemp makes it private to this user
+        os.rename(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        # Another process saved the same matrix first
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            raise
+
+
+def read_table(table, version, training=True, store_dir=os.path.join(CACHE_DIR, 'feature_store')):
+    '''
+    DataFrame of a feature table: a local CSV, the feature store partitions of a store version (see
+    table_version()), or the bucket CSV. Store reads leave out the DROP_COLS no matrix uses.
+    store_dir = local copy of the feature store that partitions are downloaded into
+    '''
+    if os.path.exists(table):
+        return pd.read_csv(table)
+    if not version.startswith(STORE_VERSION_PREFIX):
+        return get_csv_df(table)
+    name = store_table(table)
+    manifest = store_reader.fetch_manifest(name)
+    seasons = sorted({p['season'] for p in store_partitions(manifest, training)})
+    columns = [c for c in manifest['columns'] if c not in DROP_COLS or c == TARGET_COL]
+    df = store_reader.read_features(name, store_dir, season=seasons, columns=columns)
+    # Team and conference come back as categoricals with every category of the dictionary; keep only the values,
+    # as in the CSV, so category codes and one-hot columns only cover the teams in the rows
+    for c in df.select_dtypes('category').columns:
+        df[c] = df[c].astype(object)
+    return df
+
+
+def load_matrix(path):
+    '''RankingMatrix of a cache directory, with its arrays memory-mapped read-only.'''
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in ARRAYS}
+    return RankingMatrix(**arrays, feature_names=meta['feature_names'],
+                         categorical_features=meta['categorical_features'], categories=meta['categories'],
+                         cache_dir=path)
+
+
+def _latest_cached(cache_dir, table, training, one_hot, dtype):
+    # Newest cached matrix of a table with the same feature definition, whatever its version
+    candidates = []
+    for name in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+        meta_path = os.path.join(cache_dir, name, 'meta.json')
+        if not os.path.exists(meta_path):
+            continue
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if name == cache_key(table, meta.get('version'), training, one_hot, dtype):
+            candidates.append((os.path.getmtime(meta_path), name))
+    return os.path.join(cache_dir, max(candidates)[1]) if candidates else None
+
+
+def cached_matrix(table='features-overall-weekly.csv', training=True, one_hot=False, dtype=np.float32,
+                  cache_dir=CACHE_DIR, refresh=False):
+    '''
+    RankingMatrix of a feature table, built once per table version and then memory-mapped from the cache.
+    table = local CSV, or the name of a table in the bucket when no such file exists (read from the feature store
+            when it is published there)
+    training, one_hot, dtype = as in ranking_matrix(); note LightGBM results match the notebook's only with float64
+    cache_dir = where the matrices are kept
+    refresh = rebuild even when the matrix is cached
+    Without network access, the newest cached matrix of a bucket table is used.
+    '''
+    version = table_version(table, training)
+    if version is None:
+        path = _latest_cached(cache_dir, table, training, one_hot, dtype)
+        if path is None:
+            raise ValueError(f"Cannot get the version of {table} and there is no cached matrix for it")
+        print(f"Could not reach the bucket; using the cached matrix {path}")
+        return load_matrix(path)
+
+    path = os.path.join(cache_dir, cache_key(table, version, training, one_hot, dtype))
+    if refresh and os.path.exists(path):
+        shutil.rmtree(path)
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        df = read_table(table, version, training, store_dir=os.path.join(cache_dir, 'feature_store'))
+        matrix = ranking_matrix(df, training=training, one_hot=one_hot, dtype=dtype)
+        del df
+        save_matrix(matrix, path, meta={'table': table, 'version': version})
+        print(f"Cached the {table} matrix in {path}")
+    return load_matrix(path)
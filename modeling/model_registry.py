@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import lightgbm as lgb
+import numpy as np
+import torch
+from sklearn.preprocessing import StandardScaler
+
+from lgbm_ranker import FINAL_ROUNDS, RANK_PARAMS, binned_dataset_file, load_binned_dataset
+from matrix_cache import CACHE_DIR, cached_matrix, table_version
+from potw_ranker import load_ranker, prepare_features
+from tree_predictor import CompiledRanker
+
+# Versioned model artifacts for the Player of the Week rankers.
+#
+# registry/{name}/{version}/ holds everything inference needs, so scoring never retrains or refits anything:
+#   model.txt / model.pth   LightGBM booster (text format) or POTWRanker state dict
+#   scaler.npz              fitted StandardScaler parameters (mean, scale, var), for the NN
+#   meta.json               model type, the ordered feature list, category lists, training data version,
+#                           parameters and metrics
+# Versions are UTC timestamps, so the newest version sorts last; "latest" resolves to it. An artifact is written
+# to a temporary directory and renamed into place, so a loader never sees half of one.
+# load_model() memoizes loaded models per process.
+
+REGISTRY_DIR = '../saved_models/registry'
+LATEST = 'latest'
+
+_loaded = {}
+
+
+def _scaler_from_npz(path):
+    '''StandardScaler with the saved fitted parameters, without fitting'''
+    with np.load(path) as params:
+        scaler = StandardScaler()
+        scaler.mean_ = params['mean']
+        scaler.scale_ = params['scale']
+        scaler.var_ = params['var']
+        scaler.n_samples_seen_ = int(params['n_samples_seen'])
+        scaler.n_features_in_ = len(scaler.mean_)
+    return scaler
+
+
+class RegisteredModel:
+    '''
+    A loaded registry artifact.
+    model = lgb.Booster or POTWRanker in eval mode
+    scaler = StandardScaler for the NN inputs, None for LightGBM
+    meta = contents of meta.json (feature_names, model_type, data_version, metrics, ...)
+    '''
+
+    def __init__(self, model, scaler, meta, path):
+        self.model = model
+        self.scaler = scaler
+        self.meta = meta
+        self.path = path
+        self.feature_names = meta['feature_names']
+        # LightGBM rows are encoded and scored by the compiled ranker (tree_predictor.py)
+        self.compiled = CompiledRanker(model, self.feature_names, meta['categories']) if meta['model_type'] == 'lgbm' else None
+
+    def features(self, df):
+        '''Model inputs of weekly feature rows, in the training column order.'''
+        if self.meta['model_type'] == 'nn':
+            X = prepare_features(df, self.feature_names).to_numpy(dtype=np.float64)
+            return self.scaler.transform(X).astype(np.float32)
+        return self.compiled.encode(df)
+
+    def score(self, df):
+        '''Score of every row of a weekly feature table, in row order (higher = more likely winner).'''
+        if len(df) == 0:
+            return np.zeros(0)
+        X = self.features(df)
+        if self.meta['model_type'] == 'nn':
+            with torch.inference_mode():
+                return self.model(torch.from_numpy(X)).squeeze(1).numpy()
+        return self.compiled.predict_encoded(X)
+
+
+def _new_version(registry_dir, name):
+    version = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+    while os.path.exists(os.path.join(registry_dir, name, version)):
+        time.sleep(1)
+        version = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+    return version
+
+
+def register_model(name, model, feature_names, scaler=None, categories=None, data_version=None, params=None,
+                   metrics=None, registry_dir=REGISTRY_DIR):
+    '''
+    Save a trained model as a new version of registry/{name}.
+    model = lgb.Booster (or a fitted LGBMRanker) or a POTWRanker
+    feature_names = the ordered training columns
+    scaler = the fitted StandardScaler of the NN inputs
+    categories = {column: categories} of the LightGBM category codes (RankingMatrix.categories)
+    data_version = training table and its version, e.g. {"table": ..., "version": ...}
+    params, metrics = training parameters and evaluation results to keep with the model
+    Returns the path of the new version.
+    '''
+    if isinstance(model, lgb.LGBMModel):
+        model = model.booster_
+    model_type = 'lgbm' if isinstance(model, lgb.Booster) else 'nn'
+    if model_type == 'nn' and scaler is None:
+        raise ValueError("An NN artifact needs the StandardScaler fitted on its training inputs")
+
+    version = _new_version(registry_dir, name)
+    path = os.path.join(registry_dir, name, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        meta = {'name': name, 'version': version, 'model_type': model_type, 'feature_names': list(feature_names),
+                'categories': categories or {}, 'data_version': data_version, 'params': params or {},
+                'metrics': metrics or {}}
+        if model_type == 'lgbm':
+            model.save_model(os.path.join(tmp, 'model.txt'))
+        else:
+            torch.save(model.state_dict(), os.path.join(tmp, 'model.pth'))
+            meta['hidden_dims'] = [layer.out_features for layer in model.network if isinstance(layer, torch.nn.Linear)][:-1]
+        if scaler is not None:
+            np.savez(os.path.join(tmp, 'scaler.npz'), mean=scaler.mean_, scale=scaler.scale_, var=scaler.var_,
+                     n_samples_seen=np.asarray(scaler.n_samples_seen_).max())
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+        os.chmod(tmp, 0o755)
+        os.rename(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    print(f"Registered {name} version {version} in {path}")
+    return path
+
+
+def list_versions(name, registry_dir=REGISTRY_DIR):
+    '''Versions of a model, oldest first'''
+    directory = os.path.join(registry_dir, name)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(v for v in os.listdir(directory) if not v.startswith('.'))
+
+
+def resolve_version(name, version=LATEST, registry_dir=REGISTRY_DIR):
+    if version != LATEST:
+        return version
+    versions = list_versions(name, registry_dir)
+    if not versions:
+        raise ValueError(f"No versions of {name} in {registry_dir}")
+    return versions[-1]
+
+
+def load_model(name, version=LATEST, registry_dir=REGISTRY_DIR):
+    '''
+    RegisteredModel of a registry artifact. Loaded once per process: later calls for the same version return the
+    same object. "latest" is resolved on every call, so a newly registered version is picked up.
+    '''
+    version = resolve_version(name, version, registry_dir)
+    path = os.path.join(registry_dir, name, version)
+    key = os.path.abspath(path)
+    if key not in _loaded:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['model_type'] == 'lgbm':
+            model = lgb.Booster(model_file=os.path.join(path, 'model.txt'))
+        else:
+            model = load_ranker(os.path.join(path, 'model.pth'))
+        scaler_path = os.path.join(path, 'scaler.npz')
+        scaler = _scaler_from_npz(scaler_path) if os.path.exists(scaler_path) else None
+        _loaded[key] = RegisteredModel(model, scaler, meta, path)
+    return _loaded[key]
+
+
+def train_final_lgbm(matrix, params=RANK_PARAMS, num_boost_round=None):
+    '''
+    The final LightGBM ranker on every training row, as in the notebook: no validation set, n_estimators rounds.
+    Trains on the binned Dataset of all rows saved next to a cached matrix, so repeated runs do not bin again.
+    num_boost_round = trees to build, default params' n_estimators, else FINAL_ROUNDS
+    '''
+    rounds = num_boost_round or params.get('n_estimators', FINAL_ROUNDS)
+    params = {name: value for name, value in params.items() if name != 'n_estimators'}
+    dataset = load_binned_dataset(binned_dataset_file(matrix)) if matrix.cache_dir is not None else None
+    if dataset is None:
+        dataset = lgb.Dataset(np.asarray(matrix.X), label=np.asarray(matrix.y), group=np.diff(matrix.group_offsets),
+                              feature_name=matrix.feature_names, categorical_feature=matrix.categorical_features)
+    return lgb.train(params, dataset, num_boost_round=rounds, callbacks=[lgb.log_evaluation(period=200)])
+
+
+def _read_json_arg(value):
+    # A JSON file path or a JSON string
+    if value is None:
+        return None
+    if os.path.exists(value):
+        with open(value) as f:
+            return json.load(f)
+    return json.loads(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Register and list Player of the Week model artifacts")
+    parser.add_argument('--registry-dir', default=REGISTRY_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    lgbm_parser = commands.add_parser('train-lgbm', help="train the final LightGBM ranker and register it")
+    lgbm_parser.add_argument('--name', default='potw_lgbm')
+    lgbm_parser.add_argument('--params', default=None,
+                             help="JSON file (e.g. tune_ranker.py --params-out) or string of parameters")
+    lgbm_parser.add_argument('--num-boost-round', type=int, default=None,
+                             help=f"trees to build, default the parameters' n_estimators, else {FINAL_ROUNDS}")
+    lgbm_parser.add_argument('--metrics', default=None, help="JSON file or string of evaluation results")
+
+    nn_parser = commands.add_parser('register-nn', help="register a trained POTWRanker state dict")
+    nn_parser.add_argument('--name', default='potw_nn')
+    nn_parser.add_argument('--model', default='../saved_models/nn_final_model.pth')
+    nn_parser.add_argument('--scaler', required=True,
+                           help="pickled StandardScaler fitted when the model was trained (nn_scaler.pkl)")
+    nn_parser.add_argument('--data-version', default=None,
+                           help="version of --table the model was trained on; without it no data version is recorded")
+    nn_parser.add_argument('--metrics', default=None, help="JSON file or string of evaluation results")
+
+    for p in (lgbm_parser, nn_parser):
+        p.add_argument('--table', default='features-overall-weekly.csv',
+                       help="local CSV, or the name of a table in the bucket when no such file exists")
+        p.add_argument('--cache-dir', default=CACHE_DIR)
+
+    list_parser = commands.add_parser('list', help="list the versions of a model")
+    list_parser.add_argument('name')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for version in list_versions(args.name, args.registry_dir):
+            with open(os.path.join(args.registry_dir, args.name, version, 'meta.json')) as f:
+                meta = json.load(f)
+            print(version, meta['data_version'], meta['metrics'])
+        raise SystemExit(0)
+
+    if args.command == 'train-lgbm':
+        data_version = {'table': args.table, 'version': table_version(args.table)}
+        params = {**RANK_PARAMS, 'n_estimators': FINAL_ROUNDS, **(_read_json_arg(args.params) or {})}
+        if args.num_boost_round is not None:
+            params['n_estimators'] = args.num_boost_round
+        matrix = cached_matrix(args.table, dtype=np.float64, cache_dir=args.cache_dir)
+        booster = train_final_lgbm(matrix, params)
+        register_model(args.name, booster, matrix.feature_names, categories=matrix.categories,
+                       data_version=data_version, params=params, metrics=_read_json_arg(args.metrics),
+                       registry_dir=args.registry_dir)
+    else:
+        # The model was trained elsewhere: the scaler comes from that training run and the data version is only
+        # recorded when the caller knows it. The table only supplies the column order.
+        data_version = {'table': args.table, 'version': args.data_version} if args.data_version else None
+        model = load_ranker(args.model)
+        with open(args.scaler, 'rb') as f:
+            scaler = pickle.load(f)
+        matrix = cached_matrix(args.table, one_hot=True, dtype=np.float64, cache_dir=args.cache_dir)
+        if not len(matrix.feature_names) == scaler.n_features_in_ == model.network[0].in_features:
+            raise ValueError(f"Model expects {model.network[0].in_features} inputs and the scaler "
+                             f"{scaler.n_features_in_}, got {len(matrix.feature_names)} training columns")
+        register_model(args.name, model, matrix.feature_names, scaler=scaler, data_version=data_version,
+                       metrics=_read_json_arg(args.metrics), registry_dir=args.registry_dir)
@@ -0,0 +1,219 @@
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import requests
+import torch
+import torch.nn as nn
+
+# Neural network Player of the Week ranker from Final_Notebook_Overall.ipynb, as a module so scripts can load the
+# saved model (saved_models/nn_final_model.pth) without running the notebook.
+#
+# The model scores each player of a (season, week, conference) group; the highest score is the predicted winner.
+# Inputs are the features-overall-weekly table minus DROP_COLS, with team and conference one-hot encoded
+# (drop_first, conference_West renamed to conference) and standardized by the scaler fitted at training time.
+
+DROP_COLS = ['full_name', 'player_id', 'pow_player_id', 'player_of_the_week', 'won_player_of_the_week',
+             'all_star_this_season', 'mvp_this_season', 'all_nba_first_team_this_season',
+             'all_nba_second_team_this_season', 'all_nba_third_team_this_season', 'week_start', 'pow_conference',
+             'is_win_vs_over_500', 'opponent_has_all_nba']
+CAT_COLS = ['team', 'conference']
+GROUP_COLS = ['season', 'week', 'conference']
+TARGET_COL = 'won_player_of_the_week'
+INFERENCE_SEASON = 2025
+FIRST_TRAINING_SEASON = 2001
+DATA_URL = "https://storage.googleapis.com/nba_award_predictor/nba_data"
+
+
+# Function to pull data from google cloud
+def get_csv_df(csv_name):
+    url = f"{DATA_URL}/{csv_name}"
+
+    r = requests.get(url)
+    r.raise_for_status()
+
+    csv_text = r.content.decode('utf-8')
+    df = pd.read_csv(StringIO(csv_text))
+    return df
+
+
+def training_rows(df):
+    '''Rows the final model is trained on: the 2001-02 season up to the season before the inference season.'''
+    return df[(df['season'] >= FIRST_TRAINING_SEASON) & (df['season'] != INFERENCE_SEASON)]
+
+
+def prepare_features(df, columns=None):
+    '''
+    Model inputs for a features-overall-weekly table.
+    df = A pandas dataframe with the weekly feature columns
+    columns = the training columns, in order. Inference rows are aligned to them: teams missing from df (e.g.
+              Bobcats, SuperSonics) get all-zero columns and teams unseen in training are dropped.
+              None encodes df like the training table (drop_first).
+    Returns a dataframe of model inputs.
+    '''
+    X = df.drop(columns=[c for c in DROP_COLS if c in df.columns])
+    if columns is None:
+        X = pd.get_dummies(X, columns=CAT_COLS, drop_first=True)
+        return X.rename(columns={'conference_West': 'conference'})
+    # Encode every category and keep the training columns, so the category dropped by drop_first in training
+    # stays the all-zero baseline even when it is missing from a single week
+    X = pd.get_dummies(X, columns=CAT_COLS, drop_first=False)
+    X = X.rename(columns={'conference_West': 'conference'})
+    return X.reindex(columns=columns, fill_value=0)
+
+
+def training_matrix(df):
+    '''(X, y) of the final model's training rows of a features-overall-weekly table, as in the notebook.'''
+    rows = training_rows(df)
+    return prepare_features(rows), rows[TARGET_COL]
+
+
+class GroupBatchSampler:
+    '''
+    Batches that keep the rows of each group (week/conference) together: groups are laid end to end in a shuffled
+    order and cut into batch_size chunks, so a group only straddles two batches at a chunk boundary.
+
+    The group index is built once from a single stable argsort of group_ids, CSR-style: `order` sorts the rows by
+    group and group g is rows offsets[g]:offsets[g + 1] of the sorted data. Every epoch only shuffles the group
+    order array in place.
+
+    Two ways to use it:
+      DataLoader(dataset, batch_sampler=sampler)  yields row indices into the original (unsorted) dataset
+      sampler.iter_batches(X, y, groups)          sorts the tensors once (pinned when CUDA is available) and yields
+                                                  batches made of contiguous slices of them: a view when the batch
+                                                  is one slice, one torch.cat of views otherwise, never a gather
+
+    group_ids = group id of every row
+    batch_size = rows per batch
+    seed = seed for the group shuffle; None uses the global numpy random state, as the notebook did
+    '''
+
+    def __init__(self, group_ids, batch_size, seed=None):
+        group_ids = np.asarray(group_ids)
+        self.batch_size = batch_size
+        self.order = np.argsort(group_ids, kind='stable')
+        sorted_ids = group_ids[self.order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]]) if len(sorted_ids) else np.zeros(0, dtype=int)
+        self.offsets = np.r_[starts, len(group_ids)]
+        self.group_order = np.arange(len(starts))
+        self.rng = np.random.default_rng(seed) if seed is not None else np.random
+        self._sorted = None
+
+    def segments(self):
+        '''
+        Shuffle the groups and yield every batch as a list of (start, stop) row ranges of the group-sorted data.
+        Ranges of groups that end up next to each other in both orders are merged.
+        '''
+        self.rng.shuffle(self.group_order)
+        starts = self.offsets[:-1][self.group_order]
+        sizes = self.offsets[1:][self.group_order] - starts
+        # Where each shuffled group starts and ends in the concatenated stream
+        ends = np.cumsum(sizes)
+        begins = ends - sizes
+        total = len(self.order)
+        for lo in range(0, total, self.batch_size):
+            hi = min(lo + self.batch_size, total)
+            batch = []
+            for g in range(np.searchsorted(ends, lo, side='right'), np.searchsorted(begins, hi, side='left')):
+                start = starts[g] + max(lo - begins[g], 0)
+                stop = starts[g] + min(hi, ends[g]) - begins[g]
+                if batch and batch[-1][1] == start:
+                    batch[-1] = (batch[-1][0], stop)
+                else:
+                    batch.append((start, stop))
+            yield batch
+
+    def __iter__(self):
+        for batch in self.segments():
+            yield self.order[np.concatenate([np.arange(start, stop) for start, stop in batch])]
+
+    def iter_batches(self, *tensors):
+        '''
+        Batches of tensors aligned with group_ids (e.g. features, labels, group ids), as tuples.
+        The tensors are sorted by group on the first call and kept; pass the same tensors every epoch.
+        '''
+        if self._sorted is None:
+            order = torch.from_numpy(self.order)
+            self._sorted = tuple(t[order].contiguous() for t in tensors)
+            if torch.cuda.is_available():
+                self._sorted = tuple(t.pin_memory() for t in self._sorted)
+        for batch in self.segments():
+            if len(batch) == 1:
+                start, stop = batch[0]
+                yield tuple(t[start:stop] for t in self._sorted)
+            else:
+                yield tuple(torch.cat([t[start:stop] for start, stop in batch]) for t in self._sorted)
+
+    def __len__(self):
+        return (len(self.order) + self.batch_size - 1) // self.batch_size
+
+
+class POTWRanker(nn.Module):
+    def __init__(self, input_dim, hidden_dims=[256, 128, 64], dropout=0.3):
+        super(POTWRanker, self).__init__()
+
+        layers = []
+        prev_dim = input_dim
+
+        # Build hidden layers
+        for hidden_dim in hidden_dims:
+            layers.append(nn.Linear(prev_dim, hidden_dim))
+            layers.append(nn.ReLU())
+            layers.append(nn.Dropout(dropout))
+            prev_dim = hidden_dim
+
+        # Output layer (single score per player)
+        layers.append(nn.Linear(prev_dim, 1))
+
+        self.network = nn.Sequential(*layers)
+
+    def forward(self, x):
+        return self.network(x)
+
+
+class PairwiseRankingLoss(nn.Module):
+    '''
+    Pairwise hinge loss: within every group (week/conference) each winner should outscore each non-winner by at
+    least margin. Mean of clamp(margin - (winner score - non-winner score), min=0) over all such pairs in the batch.
+
+    All groups are handled at once: the winners of the batch are compared with every row, and pairs are kept
+    when both rows are in the same group and the other row is a non-winner. A batch rarely holds more than a
+    few winners, so the winners x batch difference matrix stays small. Groups without a winner or without a
+    non-winner add no pairs.
+    '''
+
+    def __init__(self, margin=1.0):
+        super(PairwiseRankingLoss, self).__init__()
+        self.margin = margin
+
+    def forward(self, scores, labels, group_indices):
+        scores = scores.reshape(-1)
+        winners = (labels == 1).nonzero(as_tuple=True)[0]
+
+        # pair_mask[i, j]: winner i and row j are in the same group and row j is a non-winner
+        pair_mask = (group_indices[winners].unsqueeze(1) == group_indices.unsqueeze(0)) & (labels == 0).unsqueeze(0)
+        num_pairs = pair_mask.sum()
+
+        # Return tensor (even if zero)
+        if num_pairs == 0:
+            return torch.tensor(0.0, requires_grad=True)
+
+        score_diff = scores[winners].unsqueeze(1) - scores.unsqueeze(0)
+        losses = torch.clamp(self.margin - score_diff, min=0)
+        return losses[pair_mask].sum() / num_pairs
+
+
+def load_ranker(model_path='../saved_models/nn_final_model.pth'):
+    '''
+    Load a saved POTWRanker state dict in eval mode on the CPU. The input size and hidden layer sizes are read
+    from the weight shapes, so they do not have to match the notebook's Optuna run.
+    '''
+    state_dict = torch.load(model_path, map_location='cpu')
+    weights = [state_dict[k] for k in sorted((k for k in state_dict if k.endswith('.weight')),
+                                             key=lambda k: int(k.split('.')[1]))]
+    input_dim = weights[0].shape[1]
+    hidden_dims = [w.shape[0] for w in weights[:-1]]
+    model = POTWRanker(input_dim, hidden_dims=hidden_dims)
+    model.load_state_dict(state_dict)
+    model.eval()
+    return model
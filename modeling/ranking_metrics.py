@@ -0,0 +1,131 @@
+import hashlib
+
+import numpy as np
+
+from lgbm_ranker import K
+
+# Grouped ranking metrics for the weekly Player of the Week predictions.
+#
+# Every metric is computed for all (season, week, conference) groups at once: one lexsort by (group, -score) puts
+# each group's rows in predicted order, and per-group sums are bincounts over the group index. Ties in score keep
+# row order (lexsort is stable), like a stable sort_values on each group.
+# GroupedEvaluator does the work that only depends on the labels (group index, sizes, ideal DCG) once, so scoring
+# the same validation rows after every boosting round, epoch or tuning trial is a single sort.
+
+
+class GroupedEvaluator:
+    '''
+    Top-k hit rate, MRR and NDCG@k of scores for fixed labels and groups.
+
+    y = labels (1 = won Player of the Week; larger values are graded relevance for NDCG)
+    group_id = integer group of every row, in any order (e.g. a groupby(...).ngroup())
+    k = cutoffs
+    skip_groups_without_winner = False (lightgbm_c.ipynb): a group without a winner counts as a miss for the hit
+                                 rate and MRR, and as 1 for NDCG (LightGBM's convention).
+                                 True (the NN notebook): such groups are left out of every metric.
+    '''
+
+    def __init__(self, y, group_id, k=K, skip_groups_without_winner=False):
+        self.y = np.asarray(y, dtype=np.float64)
+        self.k = list(k)
+        self.skip_groups_without_winner = skip_groups_without_winner
+        _, self.group_index = np.unique(np.asarray(group_id), return_inverse=True)
+        self.group_index = self.group_index.reshape(-1)
+        sizes = np.bincount(self.group_index)
+        self.n_groups = len(sizes)
+        # In group-sorted order: the group of every position and its 0-based rank within the group
+        self.sorted_group = np.repeat(np.arange(self.n_groups), sizes)
+        self.position = np.arange(len(self.y)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        self.discount = 1 / np.log2(self.position + 2)
+        self.has_winner = np.bincount(self.group_index, weights=self.y > 0, minlength=self.n_groups) > 0
+
+        ideal = self.y[np.lexsort((-self.y, self.group_index))]
+        ideal_gain = (2 ** ideal - 1) * self.discount
+        self.ideal_dcg = {i: np.bincount(self.sorted_group, weights=ideal_gain * (self.position < i),
+                                         minlength=self.n_groups) for i in self.k}
+
+    def order(self, score):
+        '''Row order that sorts by group, then by score descending.'''
+        return np.lexsort((-np.asarray(score), self.group_index))
+
+    def winner_ranks(self, score):
+        '''Rank (1 = top) of every winning row within its group.'''
+        ranked_y = self.y[self.order(score)]
+        return self.position[ranked_y > 0] + 1
+
+    def _first_winner_rank(self, ranked_y):
+        rank = np.full(self.n_groups, np.inf)
+        winners = np.flatnonzero(ranked_y > 0)
+        # Positions are sorted by group, so np.unique's first index is each group's best-ranked winner
+        groups, first = np.unique(self.sorted_group[winners], return_index=True)
+        rank[groups] = self.position[winners[first]] + 1
+        return rank
+
+    def first_winner_rank(self, score):
+        '''Rank of the best-ranked winner of every group; inf for groups without a winner.'''
+        return self._first_winner_rank(self.y[self.order(score)])
+
+    def evaluate(self, score):
+        '''
+        Metrics of score (one value per row, higher = more likely winner), as a dict:
+        Top_{k}_avg_hits = share of groups with a winner in the top k
+        MRR = mean reciprocal rank of the best-ranked winner
+        NDCG@{k} = mean NDCG at k (gain 2^label - 1, log2 discount)
+        '''
+        ranked_y = self.y[self.order(score)]
+        rank = self._first_winner_rank(ranked_y)
+        gain = (2 ** ranked_y - 1) * self.discount
+
+        keep = self.has_winner if self.skip_groups_without_winner else np.ones(self.n_groups, dtype=bool)
+        if not keep.any():
+            return {**{f"Top_{i}_avg_hits": np.nan for i in self.k}, "MRR": np.nan,
+                    **{f"NDCG@{i}": np.nan for i in self.k}}
+        out = {f"Top_{i}_avg_hits": float(np.mean(rank[keep] <= i)) for i in self.k}
+        out["MRR"] = float(np.mean(1 / rank[keep]))
+        for i in self.k:
+            dcg = np.bincount(self.sorted_group, weights=gain * (self.position < i), minlength=self.n_groups)
+            ideal = self.ideal_dcg[i]
+            ndcg = np.divide(dcg, ideal, out=np.ones(self.n_groups), where=ideal > 0)
+            out[f"NDCG@{i}"] = float(np.mean(ndcg[keep]))
+        return out
+
+    __call__ = evaluate
+
+
+def grouped_metrics(y, score, group_id, k=K, skip_groups_without_winner=False):
+    '''One-off GroupedEvaluator(y, group_id, k, skip_groups_without_winner).evaluate(score)'''
+    return GroupedEvaluator(y, group_id, k, skip_groups_without_winner).evaluate(score)
+
+
+def _cached_evaluate(cache, k, y_true, y_pred, group, metrics):
+    # The evaluator of each eval set is built on its first evaluation and reused every round. LightGBM hands in
+    # the same label array every round; the content hash keeps a new array that reuses a freed id from matching.
+    y_true = np.asarray(y_true)
+    key = (id(y_true), hashlib.sha1(y_true.tobytes()).hexdigest(), np.asarray(group).tobytes())
+    if key not in cache:
+        cache[key] = GroupedEvaluator(y_true, np.repeat(np.arange(len(group)), group), k)
+    result = cache[key].evaluate(y_pred)
+    return [(name, result[name], True) for name in metrics]
+
+
+def lightgbm_metric(k=K, metrics=("Top_1_avg_hits", "MRR")):
+    '''
+    eval_metric for LGBMRanker.fit(): reports `metrics` of GroupedEvaluator.evaluate() for each eval set, e.g.
+    model.fit(..., eval_metric=lightgbm_metric()) logs valid_0's Top_1_avg_hits and MRR every round.
+    '''
+    cache = {}
+
+    def metric(y_true, y_pred, weight, group):
+        return _cached_evaluate(cache, k, y_true, y_pred, group, metrics)
+
+    return metric
+
+
+def lightgbm_feval(k=K, metrics=("Top_1_avg_hits", "MRR")):
+    '''The same metrics as lightgbm_metric() as a feval for lgb.train()'''
+    cache = {}
+
+    def feval(preds, eval_data):
+        return _cached_evaluate(cache, k, eval_data.get_label(), preds, eval_data.get_group(), metrics)
+
+    return feval
@@ -0,0 +1,221 @@
+import argparse
+import json
+import pickle
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import torch
+
+from model_registry import LATEST, REGISTRY_DIR, load_model
+from potw_ranker import GROUP_COLS, load_ranker, prepare_features
+
+# Long-lived scoring service around the saved POTWRanker.
+#
+# The model, scaler and training columns are loaded once. Callers hand in weekly feature rows for one or more
+# (season, week, conference) groups and get back the top-k candidates of every group, either in process
+# (RankerService.rank()) or over local HTTP (serve(), POST /rank).
+# Requests are scaled on the caller's thread and queued; a single worker thread takes everything queued within
+# max_wait_ms (up to max_batch_rows rows), runs one forward pass under torch.inference_mode() and hands each
+# caller its slice of the scores, so concurrent dashboard refreshes share forward passes.
+
+MAX_BATCH_ROWS = 16384
+MAX_WAIT_MS = 5
+OUTPUT_COLS = ['player_id', 'full_name', 'team']
+
+
+class RankerService:
+    '''
+    model = POTWRanker in eval mode, e.g. from load_ranker()
+    scaler = the StandardScaler fitted on the training matrix
+    columns = the training columns, in order
+    max_batch_rows = most rows scored in one forward pass
+    max_wait_ms = how long the worker waits for more requests to join a forward pass
+    threads = torch intra-op threads, default torch's own choice
+    '''
+
+    def __init__(self, model, scaler, columns, max_batch_rows=MAX_BATCH_ROWS, max_wait_ms=MAX_WAIT_MS, threads=None):
+        self.model = model.eval()
+        self.scaler = scaler
+        self.columns = list(columns)
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        if threads is not None:
+            torch.set_num_threads(threads)
+        self.batches = 0
+        self._queue = queue.Queue()
+        worker = threading.Thread(target=self._run, daemon=True)
+        worker.start()
+
+    @classmethod
+    def from_files(cls, model_path, scaler_path, columns_path, **kwargs):
+        '''
+        Load the service from the saved model and the scaler and columns it was trained with.
+        scaler_path = pickled StandardScaler (nn_scaler.pkl from the notebook)
+        columns_path = JSON list of the training columns
+        Nothing is refitted here: a scaler fitted on today's table would not match the one the network was trained
+        with. Without these files, register the model and use from_registry().
+        '''
+        if scaler_path is None or columns_path is None:
+            raise ValueError("The training scaler and columns files are required; without them, load the model "
+                             "from the registry (from_registry) instead")
+        model = load_ranker(model_path)
+        with open(scaler_path, 'rb') as f:
+            scaler = pickle.load(f)
+        with open(columns_path) as f:
+            columns = json.load(f)
+        if len(columns) != model.network[0].in_features:
+            raise ValueError(f"Model expects {model.network[0].in_features} inputs, got {len(columns)} training columns")
+        return cls(model, scaler, columns, **kwargs)
+
+    @classmethod
+    def from_registry(cls, name='potw_nn', version=LATEST, registry_dir=REGISTRY_DIR, **kwargs):
+        '''Load the service from an NN artifact of the model registry; nothing is rebuilt or refitted.'''
+        artifact = load_model(name, version, registry_dir)
+        if artifact.meta['model_type'] != 'nn':
+            raise ValueError(f"{name} {artifact.meta['version']} is a {artifact.meta['model_type']} model, not a POTWRanker")
+        return cls(artifact.model, artifact.scaler, artifact.feature_names, **kwargs)
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            rows = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while rows < self.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                rows += len(item[0])
+
+            try:
+                X = np.concatenate([x for x, _ in pending]) if len(pending) > 1 else pending[0][0]
+                with torch.inference_mode():
+                    scores = self.model(torch.from_numpy(X)).squeeze(1).numpy()
+                self.batches += 1
+                start = 0
+                for x, future in pending:
+                    future.set_result(scores[start:start + len(x)].copy())
+                    start += len(x)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def score(self, df):
+        '''Model score of every row of a weekly feature table, in row order.'''
+        if len(df) == 0:
+            return np.zeros(0, dtype=np.float32)
+        X = self.scaler.transform(prepare_features(df, self.columns).values).astype(np.float32)
+        future = Future()
+        self._queue.put((X, future))
+        return future.result()
+
+    def rank(self, df, k=10):
+        '''
+        Top-k candidates of every (season, week, conference) group in df.
+        Returns GROUP_COLS, the OUTPUT_COLS present in df, score and rank (1 = predicted winner), sorted by group
+        and rank.
+        '''
+        out = df[GROUP_COLS + [c for c in OUTPUT_COLS if c in df.columns]].reset_index(drop=True)
+        out['score'] = self.score(df)
+        group_id = out.groupby(GROUP_COLS, sort=False, observed=True).ngroup().to_numpy()
+        order = np.lexsort((-out['score'].to_numpy(), group_id))
+        out = out.iloc[order].reset_index(drop=True)
+        out['rank'] = out.groupby(group_id[order], sort=False).cumcount() + 1
+        return out[out['rank'] <= k].sort_values(GROUP_COLS + ['rank'], kind='mergesort').reset_index(drop=True)
+
+
+def _group_records(ranked):
+    groups = []
+    for key, g in ranked.groupby(GROUP_COLS, sort=False, observed=True):
+        group = {col: (value.item() if hasattr(value, 'item') else value) for col, value in zip(GROUP_COLS, key)}
+        group['candidates'] = json.loads(g.drop(columns=GROUP_COLS).to_json(orient='records'))
+        groups.append(group)
+    return groups
+
+
+def serve(service, host='127.0.0.1', port=8765):
+    '''
+    Serve the service over local HTTP until interrupted.
+      POST /rank  {"rows": [weekly feature rows as records], "k": 10} -> {"groups": [{season, week, conference, candidates}]}
+      GET /health -> {"status": "ok", "batches": forward passes so far}
+    Each request runs on its own thread, so concurrent requests are micro-batched by the service.
+    '''
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, body):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._reply(200, {'status': 'ok', 'batches': service.batches})
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/rank':
+                self._reply(404, {'error': 'not found'})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                ranked = service.rank(pd.DataFrame.from_records(request['rows']), k=int(request.get('k', 10)))
+                self._reply(200, {'groups': _group_records(ranked)})
+            except (KeyError, ValueError) as e:
+                self._reply(400, {'error': str(e)})
+            except Exception as e:
+                traceback.print_exc()
+                self._reply(500, {'error': f"{type(e).__name__}: {e}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Scoring service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Player of the Week rankings from the saved POTWRanker")
+    parser.add_argument('--registry-name', default=None,
+                        help="serve this model of the registry (model_registry.py) instead of --model/--scaler/--columns")
+    parser.add_argument('--registry-version', default=LATEST)
+    parser.add_argument('--model', default='../saved_models/nn_final_model.pth')
+    parser.add_argument('--scaler', default=None,
+                        help="pickled StandardScaler from training (nn_scaler.pkl); required without --registry-name")
+    parser.add_argument('--columns', default=None,
+                        help="JSON list of the training columns; required without --registry-name")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch-rows', type=int, default=MAX_BATCH_ROWS)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--threads', type=int, default=None)
+    args = parser.parse_args()
+
+    service_args = dict(max_batch_rows=args.max_batch_rows, max_wait_ms=args.max_wait_ms, threads=args.threads)
+    if args.registry_name is not None:
+        service = RankerService.from_registry(args.registry_name, args.registry_version, **service_args)
+    else:
+        if args.scaler is None or args.columns is None:
+            parser.error("--scaler and --columns are required unless the model is served from the registry (--registry-name)")
+        service = RankerService.from_files(args.model, args.scaler, args.columns, **service_args)
+    serve(service, args.host, args.port)
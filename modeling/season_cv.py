@@ -0,0 +1,213 @@
+import argparse
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from lgbm_ranker import K, RANK_PARAMS, binned_dataset_file, load_binned_dataset, row_subset
+from matrix_cache import CACHE_DIR, cached_matrix
+from ranking_metrics import GroupedEvaluator
+
+# Walk-forward season cross-validation for the LightGBM ranker.
+#
+# Fold f validates on the f-th most recent season and trains on every season before it, as in the notebook.
+# Rows are sorted by (season, week, conference), so both sides of a fold are row ranges computed once from the
+# season column; no masks or copies of X per fold.
+# Folds run in a process pool. The feature matrix and labels are copied once into shared memory (a matrix from
+# matrix_cache.py is already in .npy files) and every worker maps them instead of receiving a pickled copy.
+# Each fold gets threads_per_fold LightGBM threads so that workers x threads does not oversubscribe the machine.
+# Histogram binning is done once per matrix and fold: for every fold, the lgb.Dataset of all rows binned with the
+# bin boundaries of that fold's training rows is saved in LightGBM's binary format (next to a cached matrix).
+# Each worker loads a fold's file once and the fold trains and validates on row subsets of it, so as in the
+# notebook the validation season never shapes the bins, and repeated runs and tuning trials never bin again.
+
+EARLY_STOPPING_ROUNDS = 100
+
+# Set in each worker by attach_shared()
+shared = {}
+
+
+def season_folds(season, folds):
+    '''
+    (fold, val_season, train_stop, val_start, val_stop) for each fold: train on rows [0, train_stop), validate on
+    rows [val_start, val_stop). season must be sorted, e.g. RankingMatrix.season.
+    '''
+    seasons = np.unique(season)
+    out = []
+    for fold in range(1, folds + 1):
+        val_season = seasons[-fold]
+        val_start = int(np.searchsorted(season, val_season, side='left'))
+        val_stop = int(np.searchsorted(season, val_season, side='right'))
+        out.append((fold, int(val_season), val_start, val_start, val_stop))
+    return out
+
+
+def topk_metrics(y, score, group_offsets, k=K):
+    '''
+    The notebook's per-fold metrics for rows sorted by group: Top_{k}_avg_hits (share of groups with a winner in
+    the top k, groups without a winner count as misses), plus the rank of every winner (Top_rank, Lowest_rank,
+    Percentiles), MRR and NDCG@{k}.
+    '''
+    evaluator = GroupedEvaluator(y, np.repeat(np.arange(len(group_offsets) - 1), np.diff(group_offsets)), k)
+    ranks = evaluator.winner_ranks(score)
+    out = {}
+    if len(ranks):
+        out.update({"Num_winners_seen": len(ranks), "Top_rank": ranks.min(), "Lowest_rank": ranks.max(),
+                    "Percentiles": np.percentile(ranks, [10, 25, 50, 75, 90])})
+    out.update(evaluator.evaluate(score) if evaluator.n_groups else {f"Top_{i}_avg_hits": np.nan for i in k})
+    return out
+
+
+def share_arrays(arrays):
+    '''Copy arrays into shared memory. Returns the blocks (keep them alive) and the spec workers attach with.'''
+    blocks, spec = [], {}
+    for name, a in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+        np.ndarray(a.shape, dtype=a.dtype, buffer=block.buf)[...] = a
+        blocks.append(block)
+        spec[name] = (block.name, a.shape, a.dtype.str)
+    return blocks, spec
+
+
+def share_matrix(matrix, names=('X', 'y', 'season', 'group_offsets')):
+    '''
+    share_arrays() of a RankingMatrix's arrays. A matrix loaded from the matrix cache is already a set of .npy
+    files, so workers map those files directly and nothing is copied.
+    '''
+    if matrix.cache_dir is not None:
+        return [], {name: os.path.join(matrix.cache_dir, f'{name}.npy') for name in names}
+    return share_arrays({name: getattr(matrix, name) for name in names})
+
+
+def attach_shared(spec, context):
+    '''
+    Process pool initializer: map the blocks of share_arrays() (or the .npy files of share_matrix()) into
+    `shared`, plus a dict of picklable context.
+    '''
+    for name, entry in spec.items():
+        if isinstance(entry, str):
+            shared[name] = np.load(entry, mmap_mode='r')
+            continue
+        block_name, shape, dtype = entry
+        block = shared_memory.SharedMemory(name=block_name)
+        shared[f'_{name}_block'] = block
+        shared[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    shared.update(context)
+
+
+def reference_dataset(train_stop):
+    '''The binned Dataset of the fold training on rows [0, train_stop), loaded once per worker process.'''
+    datasets = shared.setdefault('_datasets', {})
+    if train_stop not in datasets:
+        datasets[train_stop] = load_binned_dataset(shared['dataset_paths'][train_stop])
+    return datasets[train_stop]
+
+
+@contextmanager
+def shared_training(matrix, folds, names=('X', 'y', 'season', 'group_offsets'), lightgbm=True):
+    '''
+    Everything pool workers need to train on a RankingMatrix: share_matrix() of its arrays and, for LightGBM,
+    the binned Dataset file of each of the season folds (binned_dataset_file() binned on the fold's training
+    rows). Yields (spec, context) for attach_shared() and frees the shared memory (and the temporary Dataset
+    files of a matrix that is not cached) on exit.
+    '''
+    tmp = None
+    context = {'feature_names': matrix.feature_names, 'categorical_features': matrix.categorical_features}
+    if lightgbm:
+        context['dataset_paths'] = {}
+        if matrix.cache_dir is None:
+            tmp = tempfile.mkdtemp(prefix='lgb-dataset-')
+        for _, _, train_stop, _, _ in season_folds(matrix.season, folds):
+            path = None if tmp is None else os.path.join(tmp, f'dataset_rows{train_stop}.bin')
+            context['dataset_paths'][train_stop] = binned_dataset_file(matrix, path, bin_stop=train_stop)
+    blocks, spec = share_matrix(matrix, names)
+    try:
+        yield spec, context
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def run_fold(fold, val_season, train_stop, val_start, val_stop, params, threads, early_stopping_rounds, k):
+    '''
+    Train and score one fold on the arrays attached by attach_shared(). The arguments after val_stop are the
+    parameters of run_season_cv(); threads = LightGBM threads for this fold.
+    Both sides of the fold are row subsets of the fold's binned Dataset, so nothing is binned here.
+    '''
+    X, y, group_offsets = shared['X'], shared['y'], shared['group_offsets']
+    inner = group_offsets[(group_offsets >= val_start) & (group_offsets <= val_stop)]
+    reference = reference_dataset(train_stop)
+    train_set = row_subset(reference, 0, train_stop)
+    val_set = row_subset(reference, val_start, val_stop)
+
+    params = {**params, 'n_jobs': threads}
+    if params.get('objective') == 'lambdarank':
+        params['eval_at'] = list(k)
+    else:
+        params.setdefault('objective', 'binary')  # what LGBMClassifier would default to
+    booster = lgb.train(params, train_set, valid_sets=[val_set],
+                        callbacks=[lgb.early_stopping(stopping_rounds=early_stopping_rounds, verbose=False)])
+    # For the binary objective this is the probability, as with predict_proba
+    score = booster.predict(X[val_start:val_stop], num_iteration=booster.best_iteration)
+
+    curr = {"Fold": fold, "Val_season": val_season, "Best_iteration": booster.best_iteration}
+    # LightGBM's own validation metrics at the best iteration, e.g. Val_ndcg@1
+    curr.update({f"Val_{name}": value for name, value in booster.best_score['valid_0'].items()})
+    curr.update(topk_metrics(y[val_start:val_stop], score, inner - val_start, k))
+    return curr
+
+
+def run_season_cv(matrix, params=RANK_PARAMS, folds=5, workers=None, threads_per_fold=None,
+                  early_stopping_rounds=EARLY_STOPPING_ROUNDS, k=K):
+    '''
+    Walk-forward season CV of a LightGBM model on a RankingMatrix.
+    params = LightGBM parameters; objective "lambdarank" trains a ranker on the groups, anything else (default
+             binary) a classifier
+    workers = folds run at the same time, default min(folds, cpu count)
+    threads_per_fold = LightGBM threads per fold, default cpu count // workers
+    Returns a dataframe with one row per fold (Top_{k}_avg_hits, winner ranks, best iteration).
+    '''
+    cpus = os.cpu_count() or 1
+    workers = workers or min(folds, cpus)
+    threads_per_fold = threads_per_fold or max(1, cpus // workers)
+    fold_specs = season_folds(matrix.season, folds)
+
+    with shared_training(matrix, folds, ('X', 'y', 'group_offsets')) as (spec, context):
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach_shared, initargs=(spec, context)) as pool:
+            futures = [pool.submit(run_fold, *fold_spec, params, threads_per_fold, early_stopping_rounds, k)
+                       for fold_spec in fold_specs]
+            cv_results = [f.result() for f in futures]
+    return pd.DataFrame(cv_results)
+
+
+def summarize(cv_df, k=K):
+    '''Averages of the Top-k hit rates across folds.'''
+    return {f"Top_{i}_avg_hits": cv_df[f"Top_{i}_avg_hits"].mean() for i in k}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward season cross-validation of the LightGBM ranker")
+    parser.add_argument('--table', default='features-overall-weekly.csv',
+                        help="local CSV, or the name of a table in the bucket when no such file exists")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--threads-per-fold', type=int, default=None)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    # float64 keeps LightGBM's binning, and so the results, the same as training on the notebook's DataFrame
+    matrix = cached_matrix(args.table, dtype=np.float64, cache_dir=args.cache_dir)
+    cv_df = run_season_cv(matrix, folds=args.folds, workers=args.workers, threads_per_fold=args.threads_per_fold)
+    print(cv_df.to_string(index=False))
+    print("Across folds:")
+    for name, value in summarize(cv_df).items():
+        print(f"Average {name.replace('_avg_hits', '').replace('_', '-')} Hits: {value}")
@@ -0,0 +1,82 @@
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import requests
+
+# Read side of the weekly feature store, for the modeling code.
+#
+# The pipeline (data_pipeline/feature_store.py) publishes each table as Parquet partitioned by season and
+# conference, with a manifest listing the columns and every partition with its md5:
+#   nba_data/feature_store/<table>/season=2024/conference=East/part-0.parquet
+#   nba_data/feature_store/<table>/manifest.json
+# This module only reads the published copy over the bucket's public URL, so it needs no credentials.
+# Partitions are downloaded into a local copy of the store and downloaded again only when their md5 changed.
+
+PUBLIC_URL = 'https://storage.googleapis.com/nba_award_predictor/'
+GCS_PREFIX = 'nba_data/feature_store/'
+PARTITIONING = ds.partitioning(pa.schema([('season', pa.int64()), ('conference', pa.string())]), flavor='hive')
+
+
+def fetch_manifest(table):
+    '''Manifest of the published copy of a table, or None when it cannot be fetched.'''
+    try:
+        response = requests.get(f'{PUBLIC_URL}{GCS_PREFIX}{table}/manifest.json', timeout=30)
+        response.raise_for_status()
+        return response.json()
+    except Exception:
+        return None
+
+
+def load_manifest(table, store_dir):
+    path = os.path.join(store_dir, table, 'manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _sync(table, manifest, partitions, store_dir):
+    '''Download the given partitions of the published table that are missing locally or out of date.'''
+    local = load_manifest(table, store_dir) or {'partitions': []}
+    local_md5 = {p['path']: p['md5'] for p in local['partitions']}
+    for p in partitions:
+        full_path = os.path.join(store_dir, table, p['path'])
+        if local_md5.get(p['path']) == p['md5'] and os.path.exists(full_path):
+            continue
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        response = requests.get(f"{PUBLIC_URL}{GCS_PREFIX}{table}/{p['path']}", timeout=300)
+        response.raise_for_status()
+        with open(full_path, 'wb') as f:
+            f.write(response.content)
+    # Record what is on disk now: the published partitions we hold, plus local ones not touched by this sync
+    synced = {p['path'] for p in partitions}
+    held = [p for p in manifest['partitions']
+            if p['path'] in synced or (local_md5.get(p['path']) == p['md5'])]
+    with open(os.path.join(store_dir, table, 'manifest.json'), 'w') as f:
+        json.dump({**manifest, 'partitions': held}, f, indent=1)
+
+
+def read_features(table, store_dir, season=None, columns=None):
+    '''
+    Read a published feature table through the local copy of the store in store_dir.
+    season = one season or a list; only the matching partitions are downloaded and opened
+    columns = columns to read, default every column. Partition columns can be included.
+    Returns a pandas dataframe with the columns in table order.
+    '''
+    manifest = fetch_manifest(table)
+    if manifest is None:
+        raise FileNotFoundError(f"No published feature store table {table} at {PUBLIC_URL}{GCS_PREFIX}")
+    seasons = None if season is None else (list(season) if isinstance(season, (list, tuple, set)) else [season])
+    partitions = [p for p in manifest['partitions'] if seasons is None or p['season'] in seasons]
+    out_cols = [c for c in manifest['columns'] if columns is None or c in columns]
+    if not partitions:
+        return pd.DataFrame(columns=out_cols)
+    _sync(table, manifest, partitions, store_dir)
+
+    table_dir = os.path.join(store_dir, table)
+    dataset = ds.dataset([os.path.join(table_dir, p['path']) for p in partitions], format='parquet',
+                         partitioning=PARTITIONING, partition_base_dir=table_dir)
+    return dataset.to_table(columns=out_cols).to_pandas()[out_cols]
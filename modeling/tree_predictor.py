@@ -0,0 +1,204 @@
+import numpy as np
+
+from potw_ranker import CAT_COLS
+
+# Fast scoring path for the LightGBM ranker.
+#
+# CompiledRanker turns weekly feature rows into one contiguous float64 buffer in the training column order with a
+# precomputed plan (column positions, category -> code lookups) and scores the whole batch, e.g. every player of
+# both conferences in a week, in one call. No DataFrame validation or pandas category mapping happens per call.
+# Two backends score the buffer:
+#   native  LightGBM's C++ predictor (Booster.predict on the buffer, no copy); the fastest
+#   numpy   the booster compiled into flat node arrays (CompiledEnsemble), evaluated with NumPy only
+# Both equal Booster.predict: features stay float64 because thresholds are doubles, and float32 inputs would
+# move values that sit next to a threshold to the other side of it.
+#
+# compile_booster() flattens every tree of a trained booster (from Booster.dump_model()) into one set of node
+# arrays: split feature, threshold, children, missing-value handling and leaf value per node, with the trees laid
+# end to end. Leaves point to themselves, so evaluation is a fixed number of vectorized steps: every (row, tree)
+# pair moves one level down per step, and after max_depth steps the leaf values are summed per row.
+# Decisions follow LightGBM's tree.h (NumericalDecision / CategoricalDecision), so the scores equal
+# Booster.predict on the same float64 inputs.
+
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+MISSING_TYPES = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+ZERO_THRESHOLD = 1e-35  # kZeroThreshold in LightGBM
+
+
+class CompiledEnsemble:
+    '''
+    Node arrays of a tree ensemble. Node n of the flattened trees:
+    feature[n], threshold[n] = split; rows with X[:, feature] <= threshold go to left[n], others to right[n]
+    default_left[n], missing_type[n] = where missing values go (LightGBM's missing_type None / Zero / NaN)
+    cat_row[n] = row of cat_left for categorical splits (category c goes left when cat_left[cat_row, c]), else -1
+    value[n] = leaf value; leaves have left[n] = right[n] = n
+    roots = first node of every tree
+    '''
+
+    def __init__(self, feature, threshold, left, right, default_left, missing_type, cat_row, cat_left, value,
+                 roots, max_depth, feature_names):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.missing_type = missing_type
+        self.cat_row = cat_row
+        self.cat_left = cat_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.feature_names = feature_names
+
+    def predict(self, X):
+        '''
+        Raw scores of rows X (n_rows x n_features, in feature_names order), like Booster.predict(X).
+        All rows and trees are evaluated together, one tree level per step.
+        '''
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return np.zeros(0)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        has_cat = len(self.cat_left) > 0
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            missing_type = self.missing_type[node]
+            is_nan = np.isnan(x)
+            # Without NaN handling, NaN is treated as 0.0
+            x = np.where(is_nan & (missing_type != MISSING_NAN), 0.0, x)
+            is_missing = (((missing_type == MISSING_ZERO) & (np.abs(x) <= ZERO_THRESHOLD))
+                          | ((missing_type == MISSING_NAN) & is_nan))
+            go_left = np.where(is_missing, self.default_left[node], x <= self.threshold[node])
+            if has_cat:
+                cat_row = self.cat_row[node]
+                is_cat = cat_row >= 0
+                if is_cat.any():
+                    # NaN and negative categories go right, as do categories beyond the largest split category
+                    codes = np.where(is_nan, -1, np.nan_to_num(x)).astype(np.int64)
+                    in_range = (codes >= 0) & (codes < self.cat_left.shape[1])
+                    cat_go_left = np.zeros(node.shape, dtype=bool)
+                    sel = is_cat & in_range
+                    cat_go_left[sel] = self.cat_left[cat_row[sel], codes[sel]]
+                    go_left = np.where(is_cat, cat_go_left, go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].sum(axis=1)
+
+
+def _flatten_tree(tree, nodes):
+    # Append the nodes of one dumped tree to nodes (a list of dicts); returns the index of its root
+    index = len(nodes)
+    node = {}
+    nodes.append(node)
+    if 'leaf_value' in tree:
+        node.update(leaf=True, value=tree['leaf_value'])
+        return index
+    node.update(leaf=False, feature=tree['split_feature'], threshold=tree['threshold'],
+                decision_type=tree['decision_type'], default_left=tree['default_left'],
+                missing_type=MISSING_TYPES[tree['missing_type']])
+    node['left'] = _flatten_tree(tree['left_child'], nodes)
+    node['right'] = _flatten_tree(tree['right_child'], nodes)
+    return index
+
+
+def _depth(tree):
+    if 'leaf_value' in tree:
+        return 0
+    return 1 + max(_depth(tree['left_child']), _depth(tree['right_child']))
+
+
+def compile_booster(booster, num_iteration=None):
+    '''
+    CompiledEnsemble of a single-output LightGBM booster (e.g. the lambdarank ranker).
+    num_iteration = trees to use; None uses the best iteration when there is one, like Booster.predict
+    '''
+    dump = booster.dump_model(num_iteration=num_iteration)
+    if dump['num_tree_per_iteration'] != 1:
+        raise ValueError("Only single-output boosters (ranking, binary, regression) can be compiled")
+    nodes, roots, max_depth = [], [], 0
+    for tree_info in dump['tree_info']:
+        roots.append(_flatten_tree(tree_info['tree_structure'], nodes))
+        max_depth = max(max_depth, _depth(tree_info['tree_structure']))
+
+    n = len(nodes)
+    feature = np.zeros(n, dtype=np.int64)
+    threshold = np.zeros(n)
+    left = np.arange(n)
+    right = np.arange(n)
+    default_left = np.zeros(n, dtype=bool)
+    missing_type = np.zeros(n, dtype=np.int8)
+    cat_row = np.full(n, -1, dtype=np.int64)
+    value = np.zeros(n)
+    cat_sets = []
+    for i, node in enumerate(nodes):
+        if node['leaf']:
+            value[i] = node['value']
+            continue
+        feature[i] = node['feature']
+        left[i] = node['left']
+        right[i] = node['right']
+        default_left[i] = node['default_left']
+        missing_type[i] = node['missing_type']
+        if node['decision_type'] == '==':
+            cat_row[i] = len(cat_sets)
+            cat_sets.append([int(c) for c in str(node['threshold']).split('||')])
+        else:
+            threshold[i] = node['threshold']
+    max_category = max((max(s) for s in cat_sets), default=-1)
+    cat_left = np.zeros((len(cat_sets), max_category + 1), dtype=bool)
+    for row, categories in enumerate(cat_sets):
+        cat_left[row, categories] = True
+
+    return CompiledEnsemble(feature, threshold, left, right, default_left, missing_type, cat_row, cat_left, value,
+                            np.asarray(roots, dtype=np.int64), max_depth, dump['feature_names'])
+
+
+class CompiledRanker:
+    '''
+    booster = trained lgb.Booster (e.g. the registry's potw_lgbm model)
+    feature_names = the ordered training columns
+    categories = {column: categories} of the category-code columns (RankingMatrix.categories)
+    backend = "native" or "numpy"
+    num_threads = threads of the native predictor; one thread is fastest for a week of rows
+    '''
+
+    def __init__(self, booster, feature_names, categories, backend='native', num_threads=1):
+        self.booster = booster
+        self.feature_names = list(feature_names)
+        self.backend = backend
+        self.num_threads = num_threads
+        self.ensemble = compile_booster(booster) if backend == 'numpy' else None
+        self.code_maps = {c: {category: code for code, category in enumerate(categories[c])} for c in CAT_COLS}
+        positions = {name: i for i, name in enumerate(self.feature_names)}
+        self.cat_positions = [positions[c] for c in CAT_COLS]
+        self.numeric_columns = [name for name in self.feature_names if name not in self.code_maps]
+        self.numeric_positions = np.array([positions[name] for name in self.numeric_columns], dtype=np.int64)
+
+    def encode(self, df):
+        '''
+        Contiguous float64 model inputs of weekly feature rows. Training columns missing from df are 0;
+        categories unseen in training get code -1, which LightGBM sends right like a missing value.
+        '''
+        X = np.empty((len(df), len(self.feature_names)), dtype=np.float64)
+        if all(name in df.columns for name in self.numeric_columns):
+            X[:, self.numeric_positions] = df[self.numeric_columns].to_numpy(dtype=np.float64)
+        else:
+            X[:, self.numeric_positions] = df.reindex(columns=self.numeric_columns, fill_value=0).to_numpy(dtype=np.float64)
+        for c, position in zip(CAT_COLS, self.cat_positions):
+            # A dict lookup per row is faster than pandas category mapping for a week of rows
+            code_map = self.code_maps[c]
+            X[:, position] = np.fromiter((code_map.get(v, -1) for v in df[c].to_numpy()), dtype=np.float64,
+                                         count=len(df))
+        return X
+
+    def predict_encoded(self, X):
+        '''Scores of an encode()d buffer'''
+        if self.backend == 'numpy':
+            return self.ensemble.predict(X)
+        return self.booster.predict(X, num_threads=self.num_threads)
+
+    def predict(self, df):
+        '''Scores of weekly feature rows, in row order (higher = more likely winner)'''
+        if len(df) == 0:
+            return np.zeros(0)
+        return self.predict_encoded(self.encode(df))
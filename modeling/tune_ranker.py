@@ -0,0 +1,271 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import optuna
+from optuna.storages import RDBStorage, RetryFailedTrialCallback
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+
+from lgbm_ranker import FINAL_ROUNDS, K, RS
+from matrix_cache import CACHE_DIR, cached_matrix
+from ranking_metrics import GroupedEvaluator
+from season_cv import EARLY_STOPPING_ROUNDS, attach_shared, run_fold, season_folds, shared, shared_training
+
+# Hyperparameter search for the Player of the Week rankers as a resumable job.
+#
+# The study lives in an Optuna RDB storage (a local SQLite file by default), so a search that dies is picked up
+# where it stopped by running the same command again, and several worker processes can run trials of the same
+# study at once. The study stops once it holds n_trials finished (complete or pruned) trials, however many
+# sessions and workers that took: every worker stops through MaxTrialsCallback, and a trial that a worker starts
+# while n_trials others are already finished or running is pruned before it trains anything and marked over_cap,
+# so racing workers never train more than n_trials. Workers send heartbeats; a trial left running by a killed
+# worker is marked failed on the next start and its parameters are retried.
+#
+# Search spaces and objectives are the notebooks': mean Top-1 hit rate over walk-forward season folds.
+# The lambdarank objective reports each fold's validation NDCG@1 as it finishes, so the median pruner stops a
+# trial after a weak season fold instead of training all five. The NN search keeps the notebook's NopPruner.
+# The training matrix comes from the matrix cache (matrix_cache.py) and the workers map its files.
+
+STORAGE = 'sqlite:///ranker_tuning.db'
+N_TRIALS = {'lgbm': 50, 'nn': 12}
+HEARTBEAT_INTERVAL = 60
+GRACE_PERIOD = 180
+MAX_RETRY = 1
+NN_EPOCHS = 25
+
+
+def lgbm_params(trial):
+    '''lambdarank parameters of a trial (lightgbm_c.ipynb search space)'''
+    return {
+        "objective": "lambdarank",
+        "metric": "ndcg",
+        "n_estimators": 3000,  # Max trees to build; early stopping will stop before if no improvement
+        "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.08),
+        "num_leaves": trial.suggest_int("num_leaves", 31, 127),
+        "min_child_samples": trial.suggest_int("min_child_samples", 10, 200),
+        "min_child_weight": trial.suggest_float("min_child_weight", 1e-3, 10.0, log=True),
+        "feature_fraction": trial.suggest_float("feature_fraction", 0.5, 1.0),
+        "bagging_fraction": trial.suggest_float("bagging_fraction", 0.5, 1.0),
+        "bagging_freq": trial.suggest_int("bagging_freq", 1, 10),
+        "lambda_l1": trial.suggest_float("lambda_l1", 1e-3, 10.0, log=True),
+        "lambda_l2": trial.suggest_float("lambda_l2", 1e-3, 10.0, log=True),
+        "random_state": RS,
+        "verbose": -1,
+    }
+
+
+def lgbm_objective(trial):
+    '''Mean Top-1 hit rate over the season folds; NDCG@1 of every fold is reported for pruning.'''
+    params = lgbm_params(trial)
+    fold_results = []
+    for fold_spec in season_folds(shared['season'], shared['folds']):
+        curr = run_fold(*fold_spec, params, shared['threads'], EARLY_STOPPING_ROUNDS, K)
+        fold_results.append(curr["Top_1_avg_hits"])
+        trial.set_user_attr(f"fold_{curr['Fold']}_top_1", curr["Top_1_avg_hits"])
+        trial.report(curr["Val_ndcg@1"], curr["Fold"])
+        if trial.should_prune():
+            raise optuna.TrialPruned()
+    return float(np.mean(fold_results))
+
+
+def nn_params(trial):
+    '''POTWRanker parameters of a trial (Final_Notebook_Overall.ipynb search space)'''
+    return {
+        'learning_rate': trial.suggest_float('learning_rate', 5e-4, 5e-3, log=True),
+        'batch_size': trial.suggest_categorical('batch_size', [256, 512]),
+        'dropout': trial.suggest_float('dropout', 0.1, 0.3),
+        'hidden_dim_1': trial.suggest_categorical('hidden_dim_1', [256, 512, 768]),
+        'hidden_dim_2': trial.suggest_categorical('hidden_dim_2', [128, 256, 384]),
+        'hidden_dim_3': trial.suggest_categorical('hidden_dim_3', [64, 128, 192]),
+        'hidden_dim_4': trial.suggest_categorical('hidden_dim_4', [32, 64, 96]),
+        'margin': trial.suggest_float('margin', 0.5, 2.0),
+        'epochs': NN_EPOCHS,
+    }
+
+
+def nn_objective(trial):
+    '''
+    Mean Top-1 accuracy of the NN over the second and third most recent seasons, as in the notebook (groups
+    without a winner are skipped). Each fold's accuracy is reported, for when a pruner is chosen.
+    '''
+    import torch
+    import torch.optim as optim
+    from sklearn.preprocessing import StandardScaler
+
+    from potw_ranker import GroupBatchSampler, PairwiseRankingLoss, POTWRanker
+
+    params = nn_params(trial)
+    hidden_dims = [params['hidden_dim_1'], params['hidden_dim_2'], params['hidden_dim_3'], params['hidden_dim_4']]
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    torch.set_num_threads(shared['threads'])
+    X, y, group_offsets = shared['X'], shared['y'], shared['group_offsets']
+    group_id = np.repeat(np.arange(len(group_offsets) - 1), np.diff(group_offsets))
+
+    fold_accuracies = []
+    # The notebook validates on folds 2 and 3 only; fold 1 is the season right before inference
+    for fold, _, train_stop, val_start, val_stop in season_folds(shared['season'], shared['folds'] + 1)[1:]:
+        scaler = StandardScaler()
+        X_train = torch.from_numpy(scaler.fit_transform(X[:train_stop]).astype(np.float32))
+        X_val = torch.from_numpy(scaler.transform(X[val_start:val_stop]).astype(np.float32))
+        sampler = GroupBatchSampler(group_id[:train_stop], batch_size=params['batch_size'], seed=RS)
+
+        model = POTWRanker(X_train.shape[1], hidden_dims=hidden_dims, dropout=params['dropout']).to(device)
+        criterion = PairwiseRankingLoss(margin=params['margin'])
+        optimizer = optim.Adam(model.parameters(), lr=params['learning_rate'])
+        tensors = (X_train, torch.from_numpy(y[:train_stop].astype(np.float32)), torch.from_numpy(group_id[:train_stop]))
+        for epoch in range(params['epochs']):
+            model.train()
+            for batch_X, batch_y, batch_groups in sampler.iter_batches(*tensors):
+                optimizer.zero_grad()
+                scores = model(batch_X.to(device))
+                loss = criterion(scores, batch_y.to(device), batch_groups.to(device))
+                loss.backward()
+                optimizer.step()
+
+        model.eval()
+        with torch.inference_mode():
+            val_scores = model(X_val.to(device)).cpu().squeeze(1).numpy()
+
+        evaluator = GroupedEvaluator(y[val_start:val_stop], group_id[val_start:val_stop], k=[1],
+                                     skip_groups_without_winner=True)
+        fold_accuracy = evaluator.evaluate(val_scores)["Top_1_avg_hits"]
+        fold_accuracies.append(fold_accuracy)
+
+        trial.set_user_attr(f"fold_{fold}_top_1", fold_accuracy)
+        trial.report(fold_accuracy, fold)
+        if trial.should_prune():
+            raise optuna.TrialPruned()
+    return float(np.mean(fold_accuracies))
+
+
+OBJECTIVES = {'lgbm': lgbm_objective, 'nn': nn_objective}
+
+
+# How each model's training matrix is encoded. float64 keeps LightGBM's binning the same as training on the
+# notebook's DataFrame; the NN casts its inputs to float32 anyway.
+MATRIX_OPTIONS = {'lgbm': dict(one_hot=False, dtype=np.float64), 'nn': dict(one_hot=True, dtype=np.float32)}
+
+
+def get_storage(url):
+    '''
+    Optuna storage with heartbeats, so trials of a killed worker are failed and retried instead of staying RUNNING.
+    SQLite waits on a locked database instead of erroring when several workers write at once.
+    '''
+    engine_kwargs = {'connect_args': {'timeout': 60}} if url.startswith('sqlite') else None
+    return RDBStorage(url, engine_kwargs=engine_kwargs, heartbeat_interval=HEARTBEAT_INTERVAL,
+                      grace_period=GRACE_PERIOD, failed_trial_callback=RetryFailedTrialCallback(max_retry=MAX_RETRY))
+
+
+def create_study(study_name, storage, model, seed=RS):
+    '''Create the study, or load it when it already exists in storage (resume).'''
+    if model == 'lgbm':
+        pruner = optuna.pruners.MedianPruner(n_startup_trials=10, n_warmup_steps=2)
+    else:
+        pruner = optuna.pruners.NopPruner()  # The notebook's folds are too skewed for a median pruner
+    return optuna.create_study(study_name=study_name, storage=storage, direction='maximize', load_if_exists=True,
+                               sampler=optuna.samplers.TPESampler(seed=seed), pruner=pruner)
+
+
+def finished_trials(study, states=(TrialState.COMPLETE, TrialState.PRUNED)):
+    '''Trials of the study in the given states, leaving out the over_cap trials pruned by _capped_objective().'''
+    return sum(not t.user_attrs.get('over_cap') for t in study.get_trials(deepcopy=False, states=states))
+
+
+def _capped_objective(study, objective, n_trials):
+    # Workers check the count and start a trial in separate storage calls, so several of them can start a trial
+    # when one is left. Only the first n_trials trials (by number) that are finished or running get to train.
+    def capped(trial):
+        earlier = [t for t in study.get_trials(deepcopy=False, states=(TrialState.COMPLETE, TrialState.PRUNED,
+                                                                        TrialState.RUNNING))
+                   if t.number < trial.number and not t.user_attrs.get('over_cap')]
+        if len(earlier) >= n_trials:
+            trial.set_user_attr('over_cap', True)
+            study.stop()
+            raise optuna.TrialPruned()
+        return objective(trial)
+    return capped
+
+
+def _optimize_worker(study_name, storage_url, model, n_trials, seed):
+    study = create_study(study_name, get_storage(storage_url), model, seed=seed)
+    optuna.storages.fail_stale_trials(study)
+    if finished_trials(study, (TrialState.COMPLETE, TrialState.PRUNED, TrialState.RUNNING)) >= n_trials:
+        return finished_trials(study)
+    study.optimize(_capped_objective(study, OBJECTIVES[model], n_trials), gc_after_trial=True,
+                   callbacks=[MaxTrialsCallback(n_trials, states=(TrialState.COMPLETE, TrialState.PRUNED))])
+    return finished_trials(study)
+
+
+def run_study(matrix, model='lgbm', study_name=None, storage=STORAGE, n_trials=None, workers=1, threads_per_trial=None,
+              folds=None):
+    '''
+    Run (or resume) a hyperparameter study until it holds n_trials finished trials. Trials that racing workers
+    start past n_trials are pruned before training and marked over_cap; finished_trials() leaves them out.
+    matrix = RankingMatrix of the training rows encoded with MATRIX_OPTIONS[model], e.g. from cached_matrix()
+    model = "lgbm" (lambdarank) or "nn" (POTWRanker)
+    study_name = name of the study in storage, default "potw_{model}"
+    storage = Optuna RDB URL, e.g. sqlite:///ranker_tuning.db or postgresql://...
+    n_trials = finished trials the study should hold, default the notebook's 50 (lgbm) / 12 (nn)
+    workers = worker processes running trials at the same time
+    threads_per_trial = LightGBM / torch threads per trial, default cpu count // workers
+    folds = season folds per trial, default 5 (lgbm) / 2 (nn)
+    Returns the study.
+    '''
+    study_name = study_name or f"potw_{model}"
+    n_trials = n_trials or N_TRIALS[model]
+    folds = folds or (5 if model == 'lgbm' else 2)
+    threads_per_trial = threads_per_trial or max(1, (os.cpu_count() or 1) // workers)
+    # Creates the study (and its tables) once before the workers race to do it
+    study = create_study(study_name, get_storage(storage), model)
+    print(f"Study {study_name}: {finished_trials(study)}/{n_trials} trials finished")
+    if finished_trials(study) >= n_trials:
+        return study
+
+    with shared_training(matrix, folds, lightgbm=(model == 'lgbm')) as (spec, context):
+        context.update({'folds': folds, 'threads': threads_per_trial})
+        # Every worker of every session seeds its sampler differently, otherwise workers would start with the same
+        # suggestions and a resumed study would repeat its first trials
+        first_seed = RS + 1000 * len(study.trials)
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach_shared, initargs=(spec, context)) as pool:
+            futures = [pool.submit(_optimize_worker, study_name, storage, model, n_trials, first_seed + worker)
+                       for worker in range(workers)]
+            for f in futures:
+                f.result()
+    return create_study(study_name, get_storage(storage), model)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable, multi-process Optuna search for the POTW rankers")
+    parser.add_argument('--model', choices=sorted(OBJECTIVES), default='lgbm')
+    parser.add_argument('--table', default='features-overall-weekly.csv',
+                        help="local CSV, or the name of a table in the bucket when no such file exists")
+    parser.add_argument('--storage', default=STORAGE)
+    parser.add_argument('--study-name', default=None)
+    parser.add_argument('--n-trials', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads-per-trial', type=int, default=None)
+    parser.add_argument('--folds', type=int, default=None)
+    parser.add_argument('--params-out', default=None,
+                        help="write the best parameters to this JSON file (for LightGBM with the final model's "
+                             "n_estimators, ready for model_registry.py train-lgbm --params)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    matrix = cached_matrix(args.table, cache_dir=args.cache_dir, **MATRIX_OPTIONS[args.model])
+    study = run_study(matrix, args.model, args.study_name, args.storage, args.n_trials, args.workers,
+                      args.threads_per_trial, args.folds)
+
+    # Optuna Results
+    print(f"Best Top-1 Accuracy: {study.best_value:.4f}")
+    print(f"Number of trials: {finished_trials(study)}")
+    print("\nBest hyperparameters:")
+    for key, value in study.best_params.items():
+        print(f"{key}: {value}")
+    if args.params_out:
+        # best_params only holds the searched parameters; the final model also needs its number of trees
+        best_params = {**study.best_params, 'n_estimators': FINAL_ROUNDS} if args.model == 'lgbm' else study.best_params
+        with open(args.params_out, 'w') as f:
+            json.dump(best_params, f, indent=2)